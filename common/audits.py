@@ -0,0 +1,79 @@
+import re
+import numpy as np
+import pandas as pd
+
+from common import fastjson
+
+# typed columns of the audit table, the other fields of the audit events are kept as object columns
+AUDIT_DTYPES = {'timestamp': 'int64', 'type': 'category'}
+AUDIT_COLUMNS = ['timestamp', 'type', 'session', 'user']
+
+_timestamp_re = re.compile(r'"timestamp"\s*:\s*(-?\d+)')
+
+
+def _may_match(line, time_window, types):
+    """
+    cheap test on the raw line, used to skip most of the filtered out events without decoding them.
+    It never discards an event that matches the filters (it may accept some events that do not match)
+    """
+    if types is not None and not any('"{}"'.format(t) in line for t in types):
+        return False
+    if time_window is not None:
+        # the top-level timestamp is one of the "timestamp" fields of the line
+        start, end = time_window
+        if not any(start < int(ts) < end for ts in _timestamp_re.findall(line)):
+            return False
+    return True
+
+
+def load_audits(audits_file, time_window=None, types=None):
+    """
+    load the audit log (one json event per line) into a columnar table, one row per event
+    time_window: if not None, (start, end) timestamps in milliseconds. Only the events with start < timestamp < end are kept
+    types: if not None, list of event types (e.g., ['LOGIN']) to keep
+    """
+    columns = {c: [] for c in AUDIT_COLUMNS}
+    num_events = 0
+    with open(audits_file, 'r') as f:
+        for line in f:
+            if not _may_match(line, time_window, types):
+                continue
+            audit_event = fastjson.loads(line)
+            if time_window is not None and not time_window[0] < audit_event['timestamp'] < time_window[1]:
+                continue
+            if types is not None and audit_event['type'] not in types:
+                continue
+
+            for k in audit_event.keys() - columns.keys():
+                # a field never seen before, missing in all the previous events
+                columns[k] = [None] * num_events
+            for k, values in columns.items():
+                values.append(audit_event.get(k))
+            num_events += 1
+
+    audit = pd.DataFrame(columns)
+    return audit.astype({c: t for c, t in AUDIT_DTYPES.items() if c in audit.columns})
+
+
+def get_logins(audit, exclude_users=[]):
+    """
+    get the LOGIN events of the audit table as a DataFrame with columns session, team, login_timestamp
+    exclude_users: users (e.g., admins and judges) whose logins are discarded
+    """
+    logins = audit[(audit['type'] == 'LOGIN') & ~audit['user'].isin(exclude_users)]
+    logins = logins[['session', 'user', 'timestamp']].rename(columns={'user': 'team', 'timestamp': 'login_timestamp'})
+    return logins.reset_index(drop=True)
+
+
+def get_sessions(logins, last_logout):
+    """
+    get the time intervals [login, logout) in which each session was used by a team. The logout is
+    not logged, so it is the next login of the same session, or last_logout for the last login of a session
+    logins: DataFrame with columns session, team, login_timestamp (see get_logins)
+    """
+    sessions = logins.rename(columns={'login_timestamp': 'login'})
+    # sessions in order of first login, logins of the same session sorted by time
+    order = np.lexsort((sessions['login'].to_numpy(), pd.factorize(sessions['session'])[0]))
+    sessions = sessions.iloc[order]
+    logouts = sessions.groupby('session', sort=False)['login'].shift(-1).fillna(last_logout).astype('int64')
+    return sessions.assign(logout=logouts)
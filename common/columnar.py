@@ -0,0 +1,91 @@
+from pathlib import Path
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# optional, when installed the frames are stored as Feather files
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+_index_column = '__index__'
+
+
+def get_frame_file(path):
+    """
+    get the file (or folder) where a frame saved with save_frame is stored. path is given without suffix
+    """
+    path = Path(path)
+    return path.with_suffix('.feather') if feather is not None else path.with_suffix('.columns')
+
+
+def frame_exists(path):
+    return get_frame_file(path).exists()
+
+
+def save_frame(df, path):
+    """
+    store a DataFrame column by column, so that load_frame can read only some of its columns.
+    With pyarrow, the frame is stored as a Feather file. Otherwise, in a folder with one file per column:
+    numeric columns are stored as .npy files, the other ones (strings, categoricals, ...) are pickled
+    path: where to store the frame, without suffix (see get_frame_file)
+    """
+    frame_file = get_frame_file(path)
+    frame_file.parent.mkdir(parents=True, exist_ok=True)
+    # written to a temporary file first, so that an interrupted write is never considered valid
+    tmp_file = frame_file.with_name(frame_file.name + '.tmp')
+    if feather is not None:
+        # feather files have no index, so it is stored as a column
+        df.reset_index(names=_index_column).to_feather(tmp_file)
+        os.replace(tmp_file, frame_file)
+        return
+
+    shutil.rmtree(tmp_file, ignore_errors=True)
+    tmp_file.mkdir()
+    columns = []
+    for i, (name, column) in enumerate(df.items()):
+        if isinstance(column.dtype, np.dtype) and column.dtype.kind in 'biuf':
+            column_file = '{}.npy'.format(i)
+            np.save(tmp_file / column_file, column.to_numpy(), allow_pickle=False)
+        else:
+            column_file = '{}.pkl'.format(i)
+            pd.to_pickle(column.reset_index(drop=True), tmp_file / column_file)
+        columns.append({'name': name, 'file': column_file})
+    pd.to_pickle(df.index, tmp_file / 'index.pkl')
+    # the schema is written last, a folder without it is not a valid frame
+    with open(tmp_file / 'schema.json', 'w') as f:
+        json.dump({'columns': columns}, f)
+    shutil.rmtree(frame_file, ignore_errors=True)
+    os.replace(tmp_file, frame_file)
+
+
+def load_frame(path, columns=None):
+    """
+    load a DataFrame stored with save_frame. Only the given columns are read from disk (all of them if None)
+    """
+    frame_file = get_frame_file(path)
+    if feather is not None:
+        df = pd.read_feather(frame_file, columns=None if columns is None else [_index_column] + list(columns))
+        return df.set_index(_index_column).rename_axis(None)
+
+    with open(frame_file / 'schema.json') as f:
+        schema = json.load(f)
+    column_files = {c['name']: c['file'] for c in schema['columns']}
+    if columns is None:
+        columns = list(column_files.keys())
+    missing = [c for c in columns if c not in column_files]
+    if len(missing) > 0:
+        raise KeyError('Columns {} not found in {}'.format(missing, frame_file))
+
+    # the frame is built from the arrays without copying them (aligning Series to the index, or consolidating, would copy them)
+    data = {}
+    for name in columns:
+        column_file = frame_file / column_files[name]
+        if column_file.suffix == '.npy':
+            data[name] = np.load(column_file, allow_pickle=False)
+        else:
+            data[name] = pd.read_pickle(column_file).array
+    return pd.DataFrame(data, index=pd.read_pickle(frame_file / 'index.pkl'), copy=False)
@@ -0,0 +1,84 @@
+import json
+import logging
+
+# optional faster decoders, used in this order of preference when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+
+def _loads_stdlib(data):
+    return json.loads(data)
+
+
+def _loads_orjson(data):
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # orjson is stricter than the stdlib (e.g., it does not accept NaN), so try again with the stdlib
+        return json.loads(data)
+
+
+def _loads_simdjson(data):
+    try:
+        return simdjson.loads(data)
+    except ValueError:
+        return json.loads(data)
+
+
+DECODERS = {'stdlib': _loads_stdlib}
+if orjson is not None:
+    DECODERS['orjson'] = _loads_orjson
+if simdjson is not None:
+    DECODERS['simdjson'] = _loads_simdjson
+
+# the decoder used by loads, the fastest one available unless changed with set_decoder
+decoder = next(name for name in ['orjson', 'simdjson', 'stdlib'] if name in DECODERS)
+_loads = DECODERS[decoder]
+
+
+def get_decoders():
+    """
+    get the names of the available decoders
+    """
+    return list(DECODERS.keys())
+
+
+def set_decoder(name):
+    """
+    select the decoder used by loads (one of get_decoders())
+    """
+    global decoder, _loads
+    if name not in DECODERS:
+        raise ValueError('JSON decoder {} not available! Available decoders: {}'.format(name, get_decoders()))
+    decoder = name
+    _loads = DECODERS[name]
+    logging.debug('Using the {} JSON decoder'.format(name))
+
+
+def loads(data):
+    """
+    decode a JSON document from a str or from (utf-8) bytes
+    """
+    return _loads(data)
+
+
+def load(f):
+    """
+    decode a JSON document from a file object, opened in text or binary mode
+    """
+    return _loads(f.read())
+
+
+def load_file(path):
+    """
+    decode a JSON file, reading it in bulk as bytes
+    """
+    with open(path, 'rb') as f:
+        return _loads(f.read())
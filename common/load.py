@@ -1,8 +1,14 @@
-import json
+from pathlib import Path
+import hashlib
 import csv
+import logging
+import sys
+from common.audits import load_audits
+from common import fastjson
 from common.runreaders import build_runreader
 
-from common.videos import Videos
+from common.segmentations import SEGMENTATIONS, get_team_segmentation, get_videos
+from common.snapshot import get_snapshot_key, load_snapshot, save_snapshot
 
 class Shot:
     def __init__(self, shotStart, shotEnd, segmentId):
@@ -22,38 +28,82 @@ def load_data(
         audits_file, 
         run_file,
         fps_file,
-        v3c_segments_files=None):
+        v3c_segments_files=None,
+        v3c_segments_cache='cache/v3c_segments',
+        lazy_videos=False,
+        snapshot_cache=None,
+        audit_time_window=None,
+        audit_types=None):
+    """
+    load the run, the audits and the V3C segments
+    audit_time_window, audit_types: filters applied while reading the audits (see common.audits.load_audits)
+    snapshot_cache: if not None, the directory where a snapshot of the parsed data is stored. The snapshot is reused
+        as long as the input files and the parsing code do not change (the input files are hashed again only when
+        their size or modification time change)
+    returns the data, with the key of the inputs of the caches derived from it in 'inputs_key' (see _get_inputs_key)
+    """
+    # load v3c segments
+    v3c_videos = get_videos(v3c_segments_files, fps_file, cache_path=v3c_segments_cache, lazy=lazy_videos)
 
-    # load run file
-    with open(run_file) as f:
-        run = json.load(f)
+    audit_filters = {'time_window': audit_time_window, 'types': audit_types}
+    if snapshot_cache is None:
+        data = _load_data(teams, audits_file, run_file, v3c_videos, audit_filters)
+        data['inputs_key'] = _get_inputs_key(data['version'], teams, run_file, fps_file, v3c_segments_files)
+        return data
 
-    # load v3c segments
-    v3c_videos = Videos(v3c_segments_files, fps_file)
+    # the segments are not part of the snapshot, they have their own compiled store
+    sources = [audits_file, run_file, fps_file] + list(v3c_segments_files)
+    snapshot_file = Path(snapshot_cache) / '{}.pkl'.format(
+        hashlib.md5('\n'.join(str(Path(s).resolve()) for s in sources).encode()).hexdigest())
+    record_file = Path(snapshot_cache) / 'file_hashes.json'
+    key = get_snapshot_key(sources, _snapshot_modules(), params=(teams, audit_filters), record_file=record_file)
+    shared = {'v3c_videos': v3c_videos}
+
+    data = load_snapshot(snapshot_file, key, shared=shared)
+    if data is None:
+        data = _load_data(teams, audits_file, run_file, v3c_videos, audit_filters)
+        try:
+            save_snapshot(snapshot_file, key, data, shared=shared)
+        except OSError as e:
+            logging.warning('Cannot save the snapshot of the competition data in {} ({})'.format(snapshot_file, e))
+    data['inputs_key'] = _get_inputs_key(data['version'], teams, run_file, fps_file, v3c_segments_files, record_file)
+    return data
+
+
+def _get_inputs_key(version, teams, run_file, fps_file, v3c_segments_files, record_file=None):
+    """
+    key of the input files used to parse the logs of the teams (see TeamLogs): the run, with the tasks, their targets and
+    the correct submission times, the FPSs and the V3C segments used by the teams (see common.segmentations)
+    """
+    files = [run_file, fps_file] + list(v3c_segments_files)
+    for segmentation in sorted({get_team_segmentation(version, team) for team in teams} - {'msb'}):
+        files += [f for f in SEGMENTATIONS[segmentation] if Path(f).exists()]
+    return get_snapshot_key(files, [], record_file=record_file)
+
+
+def _snapshot_modules():
+    # the modules whose code determines the parsed data
+    return [sys.modules[name] for name in [
+        __name__, 'common.audits', 'common.runreaders', 'common.tasks', 'common.submissions', 'common.teams', 'common.videos']]
+
+
+def _load_data(teams, audits_file, run_file, v3c_videos, audit_filters):
+    # load run file
+    with open(run_file, 'rb') as f:
+        run = fastjson.load(f)
 
     # load run and audits file
-    audit = []
     if '2021' in run_file:
         version = '2021'
-        for line in open(audits_file, 'r'):
-            audit.append(json.loads(line))
     elif 'vbse2022' in run_file:
         version = 'vbse2022'
-        for line in open(audits_file, 'r'):
-            audit.append(json.loads(line))
     elif '2022' in run_file:
         version = '2022'
-        for line in open(audits_file, 'r'):
-            audit.append(json.loads(line))
     elif '2023' in run_file:
         version = '2023'
-        for line in open(audits_file, 'r'):
-            audit_event=json.loads(line)
-            if 1672831958820<audit_event['timestamp']<1673308800000:
-                audit.append(audit_event)
-
     else:
         raise ValueError("Cannot infer the version to use to read the run file!")
+    audit = load_audits(audits_file, **audit_filters)
     runreader = build_runreader(run, v3c_videos, teams, version=version)
 
 
@@ -4,14 +4,23 @@ import pandas as pd
 import numpy as np
 import os
 import tqdm
+import hashlib
 import json
 import logging
-from .videos import Videos
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from .segmentations import get_segmentation, get_team_segmentation
+from . import columnar, fastjson
 
 class TeamLogParser():
     def __init__(self, data, team, v3c_videos) -> None:
         version = data['version']
         self.v3c_videos = v3c_videos
+        segmentation = get_team_segmentation(version, team)
+        if segmentation != 'msb':
+            # patch the v3c_video to use the segments of the team (e.g., cineast used other segments). These are shared among all the parsers
+            self.v3c_videos = get_segmentation(segmentation, data['args'].v3c_fps_file, cache_path=v3c_videos.cache_path, lazy=v3c_videos.lazy)
+
         if version == '2022':
             if team == 'diveXplore':
                 self.get_results = self.get_results_divexplore_2022
@@ -23,10 +32,6 @@ class TeamLogParser():
                 self.get_results = self.get_results_standard_2022 # if the team followed the standard, this function works just fine
 
             self.get_events = self.get_events_standard_2022 # if version == '2022' else None
-
-            if team == 'vitrivr':
-                # patch the v3c_video to use their segments (cineast used other segments)
-                self.v3c_videos = Videos(['data/v3c1_2_cineast_segments.csv'], data['args'].v3c_fps_file)
         elif version == 'vbse2022':
             self.get_results = self.get_results_standard_2022
             self.get_events = self.get_events_standard_2022
@@ -37,7 +42,7 @@ class TeamLogParser():
     def get_results_standard_2022(self, result):
         result = result.rename(columns={'item': 'videoId'})
         # result['shotId'] = result.apply(lambda x: self.v3c_videos.get_shot_from_video_and_frame(x['videoId'], x['frame'], unit='milliseconds'), axis=1)
-        result['shotTimeMs'] = result.apply(lambda x: self.v3c_videos.get_shot_time_from_video_and_frame(x['videoId'], x['frame']), axis=1)
+        result['shotTimeMs'] = self.v3c_videos.get_shot_times_from_videos_and_frames(result['videoId'], result['frame'])
         result = result.filter(['shotTimeMs', 'shotId', 'videoId', 'rank'])
         result = result.astype(int)
         return result
@@ -45,7 +50,7 @@ class TeamLogParser():
     # submitted the segment, not the frame
     def get_results_verge_2022(self, result):
         result = result.rename(columns={'item': 'videoId'})
-        result['shotTimeMs'] = result.apply(lambda x: self.v3c_videos.get_shot_time_from_video_and_segment(x['videoId'], x['segment'], method='middle_frame'), axis=1)
+        result['shotTimeMs'] = self.v3c_videos.get_shot_times_from_videos_and_segments(result['videoId'], result['segment'], method='middle_frame')
         result = result.filter(['shotTimeMs', 'shotId', 'videoId', 'rank'])
         result = result.astype(int)
         return result
@@ -54,7 +59,7 @@ class TeamLogParser():
     def get_results_vitrivr_2022(self, result):
         result = result.rename(columns={'item': 'videoId'})
         result['videoId'] = result['videoId'].apply(lambda x: x.replace('v_', '')) # remove leading "v_"
-        result['shotTimeMs'] = result.apply(lambda x: self.v3c_videos.get_shot_time_from_video_and_segment(x['videoId'], x['segment'], method='middle_frame'), axis=1)
+        result['shotTimeMs'] = self.v3c_videos.get_shot_times_from_videos_and_segments(result['videoId'], result['segment'], method='middle_frame')
         result = result.filter(['shotTimeMs', 'shotId', 'videoId', 'rank'])
         result['videoId'] = result['videoId'].astype(int)
         return result
@@ -68,7 +73,8 @@ class TeamLogParser():
             logging.warning('Found no "frame" information inside the results data. Setting to nan')
             result['shotTimeMs'] = np.nan
         else:
-            result['shotTimeMs'] = result.apply(lambda x: self.v3c_videos.get_shot_time_from_video_and_frame(x['videoId'], x['frame']), axis=1)
+            # the results without "frame" information are set to Videos.INVALID
+            result['shotTimeMs'] = self.v3c_videos.get_shot_times_from_videos_and_frames(result['videoId'], result['frame'])
         result['videoId'] = result['videoId'].astype(int)
         result = result.filter(['shotTimeMs', 'shotId', 'videoId', 'rank'])
         return result
@@ -83,35 +89,391 @@ class TeamLogParser():
         return events
     
 
+parser_version = 5   # bump when the parsing of the log files or the computation of the ranks changes
+
+# compact schema of the results and the events of the teams
+RANK_NOT_FOUND = np.iinfo(np.int32).max   # rank of a correct result that is not in the ranked list
+CATEGORICAL_COLUMNS = ['team', 'task', 'category', 'type']
+SORT_COLUMNS = ['task', 'user', 'timestamp']   # order of the rows (see LogIndex)
+
+
+def to_compact_dtypes(df):
+    """
+    convert the results or the events of a team to the compact dtypes: categoricals for the repeated strings (team, task,
+    category and type), int8 user, int64 timestamp, int32 ranks with RANK_NOT_FOUND instead of inf
+    """
+    # categories sorted by name, so that the rows are sorted by name (see sort_logs)
+    categoricals = {}
+    for c in CATEGORICAL_COLUMNS:
+        if c in df.columns:
+            column = df[c].astype('category')
+            categoricals[c] = column.cat.set_categories(sorted(column.cat.categories))
+    dtypes = {}
+    for c, dtype in [('user', np.int8), ('timestamp', np.int64)]:
+        # the logs generated externally may use other types
+        if c in df.columns and pd.api.types.is_integer_dtype(df[c]):
+            dtypes[c] = dtype
+    ranks = {c: np.where(np.isfinite(df[c]), df[c], RANK_NOT_FOUND).astype(np.int32)
+             for c in df.columns if c == 'rank' or c.startswith('rank_')}
+    return df.assign(**ranks, **categoricals).astype(dtypes)
+
+
+def to_plain_dtypes(df):
+    """
+    convert the results or the events of a team from the compact dtypes (see to_compact_dtypes) back to the plain ones:
+    objects for the categoricals, int64 user, int64 rank and float64 ranks of the correct results, with inf instead of RANK_NOT_FOUND
+    """
+    dtypes = {c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)}
+    if 'user' in df.columns and pd.api.types.is_integer_dtype(df['user']):
+        dtypes['user'] = np.int64
+    if 'rank' in df.columns:
+        dtypes['rank'] = np.int64
+    ranks = {c: df[c].astype(float).mask(df[c] == RANK_NOT_FOUND, np.inf) for c in df.columns if c.startswith('rank_')}
+    return df.assign(**ranks).astype(dtypes)
+
+
+def sort_logs(df):
+    """
+    sort the results or the events of a team by (task, user, timestamp). The rows with the same key keep their order
+    """
+    return df.sort_values(SORT_COLUMNS, kind='stable', ignore_index=True)
+
+
+def get_manifest_entry(path, user_idx, previous_entry=None):
+    """
+    describe a log file for the manifest: user, size, modification time and content hash.
+    The hash is computed again only if the size or the modification time differ from previous_entry
+    """
+    stat = os.stat(path)
+    entry = {'user': user_idx, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if previous_entry is not None and previous_entry['size'] == entry['size'] and previous_entry['mtime_ns'] == entry['mtime_ns']:
+        entry['md5'] = previous_entry['md5']
+    else:
+        with open(path, 'rb') as f:
+            entry['md5'] = hashlib.md5(f.read()).hexdigest()
+    return entry
+
+
+def is_changed(entry, previous_entry):
+    """
+    whether a log file must be parsed again: it is new, its content changed, or it is now assigned to another user
+    """
+    return previous_entry is None or entry['md5'] != previous_entry['md5'] or entry['user'] != previous_entry['user']
+
+
+def get_ranks_of_correct_results(results_df, tasks, target_shot_margins=[0, 5], by=None):
+    """
+    computes the rank of the correct video and shot of all the logged ranked lists at once. Every result is joined with the
+    target of its task, then the ranks of the correct results are reduced with a single grouped min.
+    It gives the same ranks as TeamLogs.get_rank_of_correct_results applied to every ranked list
+    results_df: the results of the ranked lists, with their task
+    tasks: the Tasks with the targets
+    target_shot_margins [list]: temporal margins of expansion of the temporal window of the target video, expressed in seconds
+    by: the ranked list of every result (an array-like, as the keys of groupby). If None, a ranked list is identified by its timestamp
+    returns a DataFrame indexed by ranked list, with columns rank_video and rank_shot_margin_{margin} (inf if not found)
+    """
+    # one target per task name (the first one, as in get_task_from_taskname)
+    targets = tasks.tasks_df.drop_duplicates('name').set_index('name')
+    target_idxs = targets.index.get_indexer(results_df['task'])
+    correct_videos = targets['correct_video'].to_numpy()[target_idxs]
+    target_starts = targets['target_start_ms'].to_numpy(dtype=np.float64)[target_idxs]
+    target_ends = targets['target_end_ms'].to_numpy(dtype=np.float64)[target_idxs]
+
+    ranks = results_df['rank'].to_numpy(dtype=np.float64)
+    correct_video = results_df['videoId'].to_numpy() == correct_videos
+    ranks_of_correct = {'rank_video': np.where(correct_video, ranks, np.inf)}
+    # results without shot time (nan) are never correct shots
+    shot_times = results_df['shotTimeMs'].to_numpy(dtype=np.float64) if 'shotTimeMs' in results_df.columns else np.full(len(results_df), np.nan)
+    for margin in target_shot_margins:
+        correct_shot = correct_video & (shot_times >= target_starts - margin * 1000) & (shot_times <= target_ends + margin * 1000)
+        ranks_of_correct['rank_shot_margin_{}'.format(margin)] = np.where(correct_shot, ranks, np.inf)
+
+    return pd.DataFrame(ranks_of_correct, index=results_df.index).groupby(results_df['timestamp'] if by is None else by).min()
+
+
+class LogIndex:
+    """
+    Index of the results or the events of a team sorted by (task, user, timestamp) (see sort_logs), with the offsets of the
+    rows of every task and of every user in a task. The rows of a task, of a user in a task, or of a time window of a user in
+    a task are a slice of the frame, found with a lookup (and a binary search for the time windows) and returned as a view,
+    without scanning or copying the frame. The selections that span more users are copied (one slice per user)
+    """
+    def __init__(self, df, task_starts={}):
+        """
+        df: results or events of a team. It is sorted first, if it is not sorted by (task, user, timestamp)
+        task_starts: start timestamp of every task, used by the time windows relative to the start of a task
+        """
+        if not self._is_sorted(df):
+            logging.debug('Logs not sorted by {}. Sorting them'.format(SORT_COLUMNS))
+            df = sort_logs(df)
+        task_codes = pd.factorize(df['task'])[0].astype(np.int64)
+        users = df['user'].to_numpy(dtype=np.int64)
+        timestamps = df['timestamp'].to_numpy(dtype=np.int64)
+        new_group = (np.diff(task_codes) != 0) | (np.diff(users) != 0)
+
+        self.df = df
+        self.task_starts = task_starts
+        self.timestamps = timestamps
+        starts = np.flatnonzero(np.concatenate([[True], new_group]))[:len(df)]
+        ends = np.append(starts[1:], len(df))[:len(starts)]
+        # rows of every (task, user) group, in order. The groups are sorted by the key task code * user span + user,
+        # where the task code is the position of the task in task_offsets
+        self.group_users = users[starts]
+        self.group_offsets = np.stack([starts, ends], axis=1)
+        self.user_min = self.group_users.min() if len(starts) > 0 else 0
+        self.user_span = (self.group_users.max() - self.user_min + 1) if len(starts) > 0 else 1
+        self.group_keys = task_codes[starts] * self.user_span + (self.group_users - self.user_min)
+        # offsets of the rows of every task
+        tasks = df['task'].to_numpy()[starts].tolist()
+        self.task_offsets = {}
+        for task, start, end in zip(tasks, starts.tolist(), ends.tolist()):
+            self.task_offsets[task] = (self.task_offsets.get(task, (start, end))[0], end)
+        self.task_codes = {task: code for code, task in enumerate(self.task_offsets)}
+
+    @staticmethod
+    def _is_sorted(df):
+        # the tasks do not need to be in order, only contiguous: the codes of factorize are in order of appearance
+        task_codes, _ = pd.factorize(df['task'])
+        users = df['user'].to_numpy(dtype=np.int64)
+        timestamps = df['timestamp'].to_numpy(dtype=np.int64)
+        same_task = np.diff(task_codes) == 0
+        same_group = same_task & (np.diff(users) == 0)
+        return (np.diff(task_codes) >= 0).all() and (np.diff(users)[same_task] >= 0).all() and (np.diff(timestamps)[same_group] >= 0).all()
+
+    def get_tasks(self):
+        return list(self.task_offsets.keys())
+
+    def get_users(self, task=None):
+        return sorted(set(self.group_users[self._get_group_range(task)].tolist()))
+
+    def _get_rows(self, slices):
+        # a single slice is returned as a view, more slices are concatenated
+        slices = [(start, end) for start, end in slices if end > start]
+        if len(slices) == 0:
+            return self.df.iloc[0:0]
+        if len(slices) == 1:
+            return self.df.iloc[slices[0][0]:slices[0][1]]
+        return pd.concat([self.df.iloc[start:end] for start, end in slices])
+
+    def _get_group_range(self, task=None):
+        # the slice of the groups of a task (all the groups if task is None), found with a binary search on the keys
+        if task is None:
+            return slice(0, len(self.group_keys))
+        if task not in self.task_codes:
+            return slice(0, 0)
+        code = self.task_codes[task]
+        lo, hi = np.searchsorted(self.group_keys, [code * self.user_span, (code + 1) * self.user_span], side='left')
+        return slice(lo, hi)
+
+    def _get_groups(self, task=None, user=None):
+        """
+        get the (start, end) rows of the groups of a task and of a user (all of them if None)
+        """
+        if user is None:
+            return self.group_offsets[self._get_group_range(task)].tolist()
+        if len(self.group_keys) == 0 or not (0 <= user - self.user_min < self.user_span):
+            return []
+        if task is None:
+            codes = np.arange(len(self.task_codes), dtype=np.int64)
+        elif task in self.task_codes:
+            codes = np.array([self.task_codes[task]], dtype=np.int64)
+        else:
+            return []
+        keys = codes * self.user_span + (user - self.user_min)
+        idxs = np.searchsorted(self.group_keys, keys).clip(max=len(self.group_keys) - 1)
+        return self.group_offsets[idxs[self.group_keys[idxs] == keys]].tolist()
+
+    def get_task(self, task):
+        """
+        get the rows of a task (a view)
+        """
+        return self._get_rows([self.task_offsets.get(task, (0, 0))])
+
+    def get_user(self, user, task=None):
+        """
+        get the rows of a user, in all the tasks or in the given task (a view if the task is given)
+        """
+        return self._get_rows(self._get_groups(task, user))
+
+    def get_time_window(self, start_timestamp, end_timestamp, task=None, user=None):
+        """
+        get the rows with start_timestamp <= timestamp <= end_timestamp, optionally of a task and of a user.
+        They are a view if both task and user are given
+        """
+        slices = []
+        for start, end in self._get_groups(task, user):
+            timestamps = self.timestamps[start:end]
+            slices.append((start + np.searchsorted(timestamps, start_timestamp, side='left'),
+                           start + np.searchsorted(timestamps, end_timestamp, side='right')))
+        return self._get_rows(slices)
+
+    def get_task_time_window(self, task, start_ms, end_ms, user=None):
+        """
+        get the rows of a task logged between start_ms and end_ms (included) milliseconds after the start of the task
+        """
+        task_start = self.task_starts[task]
+        return self.get_time_window(task_start + start_ms, task_start + end_ms, task, user)
+
+
 class TeamLogs:
-    def __init__(self, data, team, max_records=10000, use_cache=False, cache_path='cache/team_logs'):
+    def __init__(self, data, team, max_records=10000, use_cache=False, cache_path='cache/team_logs', workers=1, chunk_size=200, target_shot_margins=[0, 5], ranks_only=False):
+        """
+        workers: number of processes used to parse the log files of the team (in chunks of chunk_size files)
+        target_shot_margins [list]: temporal margins (in seconds) of expansion of the target segment used to compute the rank of the correct shot
+        ranks_only: if True, the results of every logged ranked list are reduced to its summary (ranks of the correct results,
+            number of results and of distinct videos) as soon as they are parsed, so df_results has one row per log instead of
+            one row per result. The events (with the ranks) are the same
+        """
         self.v3c_videos = data['v3c_videos']
         self.runreader = data['runreader']
         self.cache_path = cache_path
         self.max_records = max_records
+        self.target_shot_margins = target_shot_margins
         self.use_cache = use_cache
         self.team = team
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.ranks_only = ranks_only
+        # the run, the tasks and the V3C segments the logs are parsed with (see common.load.load_data)
+        self.inputs_key = data.get('inputs_key')
+        self.cache_key = self.get_cache_key(max_records, target_shot_margins, ranks_only, self.inputs_key)
+
+        # the frames are read from the cache files only when (and if) they are used
+        self._df_results, self._df_events = None, None
+        self._results_index, self._events_index = None, None
+        self.results_cache_file, self.events_cache_file = self._cache(data)
+
+    @property
+    def df_results(self):
+        if self._df_results is None:
+            self._df_results = self._read_frame(self.results_cache_file)
+        return self._df_results
+
+    @property
+    def df_events(self):
+        if self._df_events is None:
+            self._df_events = self._read_frame(self.events_cache_file)
+        return self._df_events
+
+    @staticmethod
+    def _read_frame(cache_file, columns=None):
+        if cache_file.suffix == '.pkl':
+            # generated externally, stored as a whole DataFrame with the plain dtypes
+            df = sort_logs(to_compact_dtypes(pd.read_pickle(cache_file)))
+            return df if columns is None else df[columns]
+        return columnar.load_frame(cache_file, columns)
+
+    def get_rank_columns(self):
+        """
+        columns of the events with the ranks of the correct results, one for the video and one for every target shot margin
+        """
+        return ['rank_video'] + ['rank_shot_margin_{}'.format(m) for m in self.target_shot_margins]
 
-        self.df_results, self.df_events = self._cache(data, force=False)
-
-    def _cache(self, data, force=False):
-        # some caching logic for results
-        cache_path = Path(self.cache_path) / data['version'] # append the version to the cache_path
-        if not cache_path.exists():
-            cache_path.mkdir(parents=True, exist_ok=True)
-        results_cache_file = cache_path / '{}_results.pkl'.format(self.team)
-        events_cache_file = cache_path / '{}_events.pkl'.format(self.team)
-        if force or (self.use_cache and (results_cache_file.exists() and events_cache_file.exists())):
-            df_results = pd.read_pickle(results_cache_file)
-            df_events = pd.read_pickle(events_cache_file)
-        else:
-            df_results, df_events = self.get_data(data)
-            df_results.to_pickle(results_cache_file)
-            df_events.to_pickle(events_cache_file)
+    @staticmethod
+    def get_cache_params(max_records=10000, target_shot_margins=[0, 5], ranks_only=False, inputs_key=None):
+        """
+        all the parameters that affect the logs of a team
+        inputs_key: key of the input files, other than the log files, the logs are parsed with (see common.load.load_data)
+        """
+        return {'parser_version': parser_version, 'max_records': max_records, 'target_shot_margins': list(target_shot_margins), 'ranks_only': ranks_only,
+                'inputs_key': inputs_key}
+
+    @classmethod
+    def get_cache_key(cls, max_records=10000, target_shot_margins=[0, 5], ranks_only=False, inputs_key=None):
+        """
+        key of the cached logs, derived from all the parameters affecting them. Logs generated with different
+        parameters (or from different inputs) are cached in different files
+        """
+        params = cls.get_cache_params(max_records, target_shot_margins, ranks_only, inputs_key)
+        return hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
 
-        return df_results, df_events
+    @staticmethod
+    def get_cache_files(cache_path, version, team, cache_key=None):
+        """
+        get the files where the results and the events of a team are cached, in columnar format (see common/columnar.py).
+        Without cache_key, the pickle files generated externally for teams without logs (e.g., by cvhunter_to_pandas.py)
+        """
+        cache_path = Path(cache_path) / version # append the version to the cache_path
+        if cache_key is None:
+            return cache_path / '{}_results.pkl'.format(team), cache_path / '{}_events.pkl'.format(team)
+        prefix = '{}_{}'.format(team, cache_key)
+        return columnar.get_frame_file(cache_path / '{}_results'.format(prefix)), columnar.get_frame_file(cache_path / '{}_events'.format(prefix))
+
+    @staticmethod
+    def get_manifest_files(cache_path, version, team, cache_key):
+        """
+        get the file where the manifest of the parsed log files of a team is cached, and the prefix of the frames
+        with their parsed content (see save_parsed_files)
+        """
+        cache_path = Path(cache_path) / version
+        prefix = '{}_{}'.format(team, cache_key)
+        return cache_path / '{}_manifest.json'.format(prefix), cache_path / '{}_parsed'.format(prefix)
 
-    def _retrieve_timestamp(self, filename, js_list):
+    def _cache(self, data):
+        """
+        make sure that the results and the events of the team are cached, and return the cache files
+        """
+        if data['config']['logs'][self.team] is None:
+            # teams without logs: their results and events are generated externally (e.g., by cvhunter_to_pandas.py),
+            # they are always read from there, so that a new version of them is never hidden by a copy
+            logging.info('Log for {} is None. Using the results and the events generated externally'.format(self.team))
+            return self.get_cache_files(self.cache_path, data['version'], self.team)
+
+        results_cache_file, events_cache_file = self.get_cache_files(self.cache_path, data['version'], self.team, self.cache_key)
+        if not results_cache_file.parent.exists():
+            results_cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cached = results_cache_file.exists() and events_cache_file.exists()
+        if self.use_cache and cached and not self.logs_changed(data, self.team, self.cache_key, self.cache_path):
+            return results_cache_file, events_cache_file
+
+        df_results, df_events = self.get_data(data)
+        columnar.save_frame(df_results, results_cache_file)
+        columnar.save_frame(df_events, events_cache_file)
+        # the events just computed are kept in memory, the raw results are read again from the cache only if used
+        self._df_events = df_events
+        return results_cache_file, events_cache_file
+
+    @classmethod
+    def _load_manifest(cls, cache_path, version, team, cache_key):
+        """
+        load the manifest of the log files parsed the last time. Returns None if there is no manifest
+        """
+        manifest_file, _ = cls.get_manifest_files(cache_path, version, team, cache_key)
+        if not manifest_file.exists():
+            return None
+        with open(manifest_file) as f:
+            return json.load(f)
+
+    @classmethod
+    def logs_changed(cls, data, team, cache_key, cache_path):
+        """
+        check whether the log files of a team changed since its cache (with the given key) was built
+        """
+        team_log = data['config']['logs'][team]
+        manifest = cls._load_manifest(cache_path, data['version'], team, cache_key)
+        if team_log is None or manifest is None:
+            # nothing to compare with
+            return False
+        log_files, _ = cls._get_log_files(team_log)
+        if len(log_files) != len(manifest['files']):
+            return True
+        previous_entries = manifest['files']
+        return any(is_changed(get_manifest_entry(path, user_idx, previous_entries.get(path)), previous_entries.get(path))
+                   for path, user_idx in log_files)
+
+    def _save_manifest(self, version, manifest_entries, parsed_files):
+        manifest_file, parsed_files_path = self.get_manifest_files(self.cache_path, version, self.team, self.cache_key)
+        manifest_file.unlink(missing_ok=True)
+        save_parsed_files(parsed_files, parsed_files_path)
+        # the manifest is written last, so that an interrupted write is never considered valid.
+        # The parameters are only informative, they are already part of the file name
+        tmp_file = manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({'params': self.get_cache_params(self.max_records, self.target_shot_margins, self.ranks_only, self.inputs_key), 'files': manifest_entries}, f)
+        os.replace(tmp_file, manifest_file)
+
+    @staticmethod
+    def _retrieve_timestamp(filename, js_list):
         try:
             # assume that every team has the timestamp in the filename
             timestamp = int(os.path.splitext(filename)[0])
@@ -120,125 +482,120 @@ class TeamLogs:
             timestamp = int(js_list['timestamp'])
         return timestamp
 
+    @staticmethod
+    def _get_log_files(team_log):
+        """
+        list the log files of a team as (path, user_idx) tuples, in os.walk order.
+        The user of a file is given by the folder structure: the number of the sub-folder containing it
+        returns the list, and the number of users
+        """
+        log_files = []
+        user_idx = 0
+        for root, _, files in os.walk(team_log):
+            for file in files:
+                if file == '.DS_Store':
+                    continue
+                log_files.append((os.path.join(root, file), user_idx))
+            if Path(root) != Path(team_log):
+                user_idx += 1   # number of user is the number of folders
+        return log_files, user_idx
+
     def get_data(self, data):
         """
         retrieve all the data
         """
-        skipped_log_inTask_info=[]
-        results_dfs = []
-        events_dfs = []
+        skipped_log_inTask_info = []
         team = self.team
         team_log = data['config']['logs'][team]
 
         if team_log is None:
-            logging.info('Log for {} is None. Forcing the use of the cache'.format(team))
-            return self._cache(data, force=True)
+            results_cache_file, events_cache_file = self.get_cache_files(self.cache_path, data['version'], team)
+            return self._read_frame(results_cache_file), self._read_frame(events_cache_file)
+
+        log_files, num_users = self._get_log_files(team_log)
+        assert num_users <= 2
+
+        # reuse the content of the files already parsed (with the cache), if they did not change
+        manifest = self._load_manifest(self.cache_path, data['version'], team, self.cache_key) if self.use_cache else None
+        parsed_files = {}
+        if manifest is not None:
+            _, parsed_files_path = self.get_manifest_files(self.cache_path, data['version'], team, self.cache_key)
+            try:
+                parsed_files = load_parsed_files(parsed_files_path)
+            except (OSError, KeyError, ValueError) as e:
+                # e.g., written by a previous version. All the files are parsed again
+                logging.warning('Cannot load the parsed log files of {} ({}). Parsing all of them'.format(team, e))
+        previous_entries = manifest['files'] if manifest is not None else {}
+        manifest_entries = {path: get_manifest_entry(path, user_idx, previous_entries.get(path)) for path, user_idx in log_files}
+        files_to_parse = [(path, user_idx) for path, user_idx in log_files
+                          if path not in parsed_files or is_changed(manifest_entries[path], previous_entries.get(path))]
+        if manifest is not None:
+            logging.info('{}: {} new or changed log files, {} removed'.format(
+                team, len(files_to_parse), len(previous_entries.keys() - manifest_entries.keys())))
 
-        user_idx = 0
         log_parser = TeamLogParser(data, team, self.v3c_videos)
-        for root, _, files in os.walk(team_log):
-            for file in tqdm.tqdm(files, desc="Processing {} logs".format(team)):
-                path = os.path.join(root, file)
-                if file == '.DS_Store':
-                    continue
-                with open(path) as f:
-                    ranked_list = json.load(f)
-
-                    timestamp = self._retrieve_timestamp(file, ranked_list)                    
-
-                    # retrieve the task we are in at the moment
-                    task = self.runreader.tasks.get_task_from_timestamp(timestamp)
-                    if task is None:
-                        # the logs outside task ranges are not important for us
-                        continue
-                    task_name = task['name']
-
-                    # if a team already submitted, all the subsequent logs are just noise, delete them
-                    csts = self.runreader.get_csts()
-                    cst = csts[team][task_name]
-                    if cst > 0 and timestamp > cst:
-                        skipped_log_inTask_info.append(f"{timestamp}, {cst}, {timestamp-cst},{task_name}")
-                        continue
-
-                    # grab relevant infos from different team log files
-                    if len(ranked_list.get('results',[])) > 0:
-                        results_df = self.get_teams_results(ranked_list['results'], log_parser.get_results, self.max_records)
-
-                        results_df['timestamp'] = timestamp
-                        results_df['user'] = user_idx
-                        results_df['task'] = task_name
-                        results_df['team'] = team
-                        results_dfs.append(results_df)
-
-                    if len(ranked_list.get('events',[])) > 0:
-                        events_df = self.get_teams_events(ranked_list['events'], log_parser.get_events)
-                        # note that in events the timestamp should be already present, but in some logs it is approximated (e.g., verge)
-                        # so it is better to get it directly from the file (otherwise the match using the timestamp does not work)
-                        events_df['timestamp'] = timestamp
-                        events_df['elapsed_since_task_start_ms'] = timestamp - task['started']
-                        events_df['correct_submission_time_ms'] = cst - task['started'] if cst > 0 else np.nan
-
-                        events_df['user'] = user_idx
-                        events_df['task'] = task_name
-                        events_df['team'] = team
-                        events_dfs.append(events_df)
-
-            if Path(root) != Path(team_log):
-                user_idx += 1   # number of user is the number of folders
+        log_reader = TeamLogFileReader(team, self.runreader.tasks, self.runreader.get_csts()[team], log_parser, self.max_records,
+                                       target_shot_margins=self.target_shot_margins, ranks_only=self.ranks_only)
+        chunks = [files_to_parse[i:i + self.chunk_size] for i in range(0, len(files_to_parse), self.chunk_size)]
+        if self.workers > 1 and len(chunks) > 1:
+            # the reader is sent once to every worker, then only the file names travel
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_log_file_reader, initargs=(log_reader,)) as executor:
+                # map returns the chunks in order, so the merge is deterministic
+                parsed_chunks = list(tqdm.tqdm(executor.map(_read_log_files, chunks), total=len(chunks),
+                    desc="Processing {} logs ({} workers)".format(team, self.workers)))
+        else:
+            parsed_chunks = [log_reader.read_files(chunk) for chunk in tqdm.tqdm(chunks, desc="Processing {} logs".format(team))]
+        for chunk, parsed_chunk in zip(chunks, parsed_chunks):
+            parsed_files.update(zip([path for path, _ in chunk], parsed_chunk))
+
+        # merge the files in os.walk order (the rows of removed files are dropped)
+        parsed_files = {path: parsed_files[path] for path, _ in log_files}
+        accumulator = TeamLogAccumulator()
+        for log, file_skipped_info in parsed_files.values():
+            if log is not None:
+                accumulator.add(log)
+            if file_skipped_info is not None:
+                skipped_log_inTask_info.append(file_skipped_info)
+        # the manifest describes the cached frames, so it is written also without cache: the frames may be used later
+        # with the cache (e.g., the ones generated by the workers of plot.py), and an old manifest would not match them
+        self._save_manifest(data['version'], manifest_entries, parsed_files)
+        del parsed_files
 
         if len(skipped_log_inTask_info)>0:
             print(f"**{team}**")
             print(f" log_timestamp, correct_submission_timestamp, timestamp - cst,task_name")
             print("\n".join(skipped_log_inTask_info))
-        assert user_idx <= 2
 
-        # prepare the final dataframe
-        results_df = pd.concat(results_dfs, axis=0).reset_index(drop=True)
-        events_df = pd.concat(events_dfs, axis=0).reset_index(drop=True)
+        # prepare the final dataframe, the events of all the files are parsed at once
+        results_df, events_df = accumulator.get_dataframes(team, log_parser.get_events)
 
         # for each timestamp, find the ranks of correct results
-        ranks_df = results_df.groupby('timestamp').apply(lambda x: self.get_rank_of_correct_results(x))
+        if self.ranks_only:
+            # the results are already reduced to the ranks of every log
+            ranks_df = results_df.groupby('timestamp')[self.get_rank_columns()].min()
+        else:
+            ranks_df = get_ranks_of_correct_results(results_df, self.runreader.tasks, target_shot_margins=self.target_shot_margins)
         ranks_df = ranks_df.reset_index()
         # merge this table with the events, the key is the timestamp column
         events_and_ranks_df = events_df.merge(ranks_df, on='timestamp')
         # sometimes there are duplicated entries due to log repetitions. Remove them
         events_and_ranks_df.drop_duplicates(inplace=True)
         # reordering columns
-        events_and_ranks_df= events_and_ranks_df[['task', 'team', 'user', 'timestamp', 'elapsed_since_task_start_ms', 'correct_submission_time_ms', 
-                            'rank_video', 'rank_shot_margin_0', 'rank_shot_margin_5', 'category', 'type', 'value', 'additionals']]
-
-        return results_df, events_and_ranks_df
-
-    def get_teams_events(self, events, events_fn):
-        if isinstance(events, dict):
-            events = [events]
-        events = pd.DataFrame(events)
-        standard_attrs = events_fn(events)
-
-        # collect non-standard attributes of the event in a single column "additionals"
-        non_standard_attrs = set(events.columns) - set(standard_attrs.columns)
-        standard_attrs['additionals'] = events[non_standard_attrs].apply(lambda x: x.to_json(), axis=1)
-        return standard_attrs
+        events_and_ranks_df= events_and_ranks_df[['task', 'team', 'user', 'timestamp', 'elapsed_since_task_start_ms', 'correct_submission_time_ms']
+                            + self.get_rank_columns() + ['category', 'type', 'value', 'additionals']]
 
-    def get_teams_results(self, results, results_fn, max_records):
-        results = results[:max_records]
-        results = pd.DataFrame(results)
-        results = results_fn(results)
+        return sort_logs(to_compact_dtypes(results_df)), sort_logs(to_compact_dtypes(events_and_ranks_df))
 
-        # correct if rank is zero-based
-        min_rank = results['rank'].min()
-        assert min_rank in [0, 1]
-        if min_rank == 0:
-            results['rank'] = results['rank'] + 1
-
-        return results
-
-    def get_rank_of_correct_results(self, result, method='timeinterval', target_shot_margins=[0, 5]): # 'shotid' or 'timeinterval'
+    def get_rank_of_correct_results(self, result, method='timeinterval', target_shot_margins=[0, 5]):
         """
-        computes the rank of correct video or shot
-        method: "shotid" or "timeinterval". "timeinterval" is the default for the 2022 evaluation (uses target shot boundaries and not the shot id)
-        target_shot_margins [list]: temporal margins of expansion of the temporal window of the target video, expressed in seconds. Only used if method=='timeinterval'
+        computes the rank of correct video or shot of a single ranked list (see get_ranks_of_correct_results for all of them at once)
+        method: only "timeinterval", used by the 2022 evaluation (uses target shot boundaries and not the shot id). The logged
+            results have a shot time but no shot id, so the shots of a result would have to be looked up first, and the shots
+            overlapping the target segment also cover times outside of it
+        target_shot_margins [list]: temporal margins of expansion of the temporal window of the target video, expressed in seconds
         """
+        if method != 'timeinterval':
+            raise ValueError('Method {} not recognized!'.format(method))
         # best_logged_rank_video = float('inf')
         # best_logged_rank_shot = float('inf')
         assert not result.empty
@@ -248,10 +605,7 @@ class TeamLogs:
 
         # initialize result dictionary
         results = {'rank_video': float('inf')}
-        if method == 'timeinterval':
-            results.update({'rank_shot_margin_{}'.format(m): float('inf') for m in target_shot_margins})
-        else:
-            results.update({'rank_shot': float('inf')})
+        results.update({'rank_shot_margin_{}'.format(m): float('inf') for m in target_shot_margins})
 
         # find correct videos
         res = res[res['videoId'] == task['correct_video']]
@@ -261,41 +615,381 @@ class TeamLogs:
             results['rank_video'] = res[['rank']].at[best_video_rank_idx, 'rank']
             # best_logged_time_video = res[['adj_logged_time']].at[best_video_rank_idx, 'adj_logged_time']
 
-            if method == 'shotid':
-                # use shot id to discriminate the correct results
-                res = res[res['shotId'] == task['correct_shot']]
-                # check also for best shot rank
-                if not res.empty:
-                    best_shot_rank_idx = res[['rank']].idxmin().iat[0]
-                    results['rank_shot'] = res[['rank']].at[best_shot_rank_idx, 'rank']
-
-            elif method == 'timeinterval':
-                for margin in target_shot_margins:
-                    # use the time interval of the shot target to discriminate the correct results
-                    res_margin = res[res['shotTimeMs'].between(task['target_start_ms'] - (margin * 1000), task['target_end_ms'] + (margin * 1000))]
-                    if not res_margin.empty:
-                        best_shot_rank_idx = res_margin[['rank']].idxmin().iat[0]
-                        results['rank_shot_margin_{}'.format(margin)] = res_margin[['rank']].at[best_shot_rank_idx, 'rank']
+            for margin in target_shot_margins:
+                # use the time interval of the shot target to discriminate the correct results
+                res_margin = res[res['shotTimeMs'].between(task['target_start_ms'] - (margin * 1000), task['target_end_ms'] + (margin * 1000))]
+                if not res_margin.empty:
+                    best_shot_rank_idx = res_margin[['rank']].idxmin().iat[0]
+                    results['rank_shot_margin_{}'.format(margin)] = res_margin[['rank']].at[best_shot_rank_idx, 'rank']
 
         return pd.Series(results)
 
+    def _get_task_starts(self):
+        tasks_df = self.runreader.tasks.tasks_df.drop_duplicates('name')
+        return dict(zip(tasks_df['name'], tasks_df['started'].tolist()))
+
+    def get_results_index(self):
+        """
+        get the index of the results, to select the results of a task, of a user or of a time window (see LogIndex)
+        """
+        if self._results_index is None:
+            self._results_index = LogIndex(self.df_results, self._get_task_starts())
+        return self._results_index
+
+    def get_events_index(self):
+        """
+        get the index of the events, to select the events of a task, of a user or of a time window (see LogIndex)
+        """
+        if self._events_index is None:
+            self._events_index = LogIndex(self.df_events, self._get_task_starts())
+        return self._events_index
+
     def filter_by_timestep(self, start_timestep, end_timestep):
-        # easy but expensive solution
-        t1 = self.df_results[self.df_results['timestamp'].between(start_timestep, end_timestep)].copy()
-        
-        # efficient implementation using bisect
-        # timestamps = self.df['timestamp'].to_list()
-        # start_idx = bisect.bisect_right(timestamps, start_timestep)
-        # end_idx = bisect.bisect_right(timestamps, end_timestep)
-        # t2 = self.df.iloc[start_idx:end_idx].copy()
-        return t1
+        return self.get_results_index().get_time_window(start_timestep, end_timestep).copy()
 
     def filter_by_task_name(self, task_name):
-        t1 = self.df_results[self.df_results['task'] == task_name].copy()
-        return t1
+        return self.get_results_index().get_task(task_name).copy()
 
-    def get_events_dataframe(self):
-        return self.df_events
+    def get_events_dataframe(self, columns=None):
+        """
+        get the events of the team, together with the ranks of the correct results
+        columns: if not None, only these columns are returned (and read from the cache)
+        """
+        if columns is None:
+            return self.df_events
+        if self._df_events is not None:
+            return self._df_events[columns]
+        return self._read_frame(self.events_cache_file, columns)
 
     def get_raw_results_dataframe(self):
         return self.df_results
+
+
+class TeamLogFileReader:
+    """
+    Read the log files of a team. It only holds what is needed to read the files, so it can be sent to worker processes
+    """
+    def __init__(self, team, tasks, csts, log_parser, max_records, target_shot_margins=[0, 5], ranks_only=False):
+        """
+        csts: correct submission times of the team, for every task
+        ranks_only: reduce the results of every log to its summary (see TeamLogs)
+        """
+        self.team = team
+        self.tasks = tasks
+        self.csts = csts
+        self.log_parser = log_parser
+        self.max_records = max_records
+        self.target_shot_margins = target_shot_margins
+        self.ranks_only = ranks_only
+
+    def read_files(self, log_files):
+        """
+        read a list of (path, user_idx) log files. The results of all the files are parsed at once
+        returns, for every file, its log (see read_file) and the info about the skipped log (each one is None if missing)
+        """
+        logs = [self.read_file(path, user_idx) for path, user_idx in log_files]
+        self.parse_results([log for log, _ in logs if log is not None and log['results'] is not None])
+        return logs
+
+    def parse_results(self, logs):
+        """
+        replace the raw results of the logs with the parsed ones (with the rank of the first result equal to 1).
+        The logs with the same result fields are parsed at once, in a single DataFrame, so that every parser sees the
+        same columns it would see parsing the logs one by one (e.g., diveXplore logs without "frame" information)
+        """
+        groups = {}
+        for log in logs:
+            groups.setdefault(frozenset(log['results']), []).append(log)
+        for group in groups.values():
+            self._parse_results(group)
+
+    def _parse_results(self, logs):
+        raw_results = _ColumnBuffer()
+        for log in logs:
+            raw_results.append(log['results'])
+        results = self.log_parser.get_results(pd.DataFrame(raw_results.pop_columns()))
+        lengths = np.array(raw_results.lengths)
+        assert len(results) == lengths.sum()
+
+        # correct if rank is zero-based, in every log
+        offsets = np.cumsum(lengths) - lengths
+        ranks = results['rank'].to_numpy()
+        min_ranks = np.minimum.reduceat(ranks, offsets)
+        assert np.isin(min_ranks, [0, 1]).all()
+        results['rank'] = ranks + np.repeat(min_ranks == 0, lengths)
+
+        if self.ranks_only:
+            # keep only the summary of every log, the results are discarded
+            results = self.get_results_summary(results, [log['task'] for log in logs], lengths)
+            offsets = np.arange(len(logs))
+
+        # split the parsed columns back into the logs
+        columns = {k: np.split(c.to_numpy(), offsets[1:]) for k, c in results.items()}
+        for i, log in enumerate(logs):
+            log['results'] = {k: c[i] for k, c in columns.items()}
+
+    def get_results_summary(self, results, tasks, lengths):
+        """
+        reduce the parsed results of some logs to one row per log: the ranks of the correct results (inf if not found),
+        the number of results and the number of distinct videos
+        tasks, lengths: the task and the number of results of every log
+        """
+        log_idxs = np.repeat(np.arange(len(lengths)), lengths)
+        results = results.assign(task=np.repeat(np.array(tasks, dtype=object), lengths))
+        summary = get_ranks_of_correct_results(results, self.tasks, self.target_shot_margins, by=log_idxs)
+        summary['num_results'] = lengths.astype(np.int32)
+        summary['num_videos'] = results['videoId'].groupby(log_idxs).nunique().to_numpy(dtype=np.int32)
+        return summary.reset_index(drop=True)
+
+    def read_file(self, path, user_idx):
+        """
+        read a log file. Its results and events are returned as raw columns (see get_columns), together with the
+        timestamp, user and task of the log, in a dict that can be added to a TeamLogAccumulator (once the results are parsed)
+        """
+        file = os.path.basename(path)
+        with open(path, 'rb') as f:
+            ranked_list = fastjson.load(f)
+
+        timestamp = TeamLogs._retrieve_timestamp(file, ranked_list)
+
+        # retrieve the task we are in at the moment
+        task = self.tasks.get_task_from_timestamp(timestamp)
+        if task is None:
+            # the logs outside task ranges are not important for us
+            return None, None
+        task_name = task['name']
+
+        # if a team already submitted, all the subsequent logs are just noise, delete them
+        cst = self.csts[task_name]
+        if cst > 0 and timestamp > cst:
+            return None, f"{timestamp}, {cst}, {timestamp-cst},{task_name}"
+
+        # note that in events the timestamp should be already present, but in some logs it is approximated (e.g., verge)
+        # so it is better to get it directly from the file (otherwise the match using the timestamp does not work)
+        results = ranked_list.get('results', [])[:self.max_records]
+        events = ranked_list.get('events', [])
+        if isinstance(events, dict):
+            events = [events]
+        log = {
+            'timestamp': timestamp,
+            'user': user_idx,
+            'task': task_name,
+            'elapsed_since_task_start_ms': timestamp - task['started'],
+            'correct_submission_time_ms': cst - task['started'] if cst > 0 else np.nan,
+            'results': get_columns(results) if len(results) > 0 else None,
+            'events': get_columns(events) if len(events) > 0 else None
+        }
+        return log, None
+
+
+def _to_array(values):
+    """
+    convert a list of json values to a numeric numpy array if all of them are numbers (bool, int or float), otherwise to an object array
+    """
+    if len(values) > 0 and not isinstance(values[0], (str, list, dict)):
+        try:
+            array = np.array(values)
+            if array.ndim == 1 and array.dtype.kind in 'biuf':
+                return array
+        except ValueError:
+            # nested values with different lengths
+            pass
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def get_columns(records):
+    """
+    convert a list of json objects (dicts) to a dict of typed columns, in order of first appearance of the fields.
+    The fields missing in some records are set to nan
+    """
+    fields = list(records[0])
+    if len(fields) > 1 and len(set(map(len, records))) == 1:
+        # fast path: usually all the records have the same fields
+        try:
+            columns = zip(*map(itemgetter(*fields), records))
+            return {k: _to_array(list(c)) for k, c in zip(fields, columns)}
+        except KeyError:
+            pass
+    fields = list(dict.fromkeys(k for record in records for k in record))
+    return {k: _to_array([record.get(k, np.nan) for record in records]) for k in fields}
+
+
+LOG_VALUES = ['timestamp', 'user', 'task', 'elapsed_since_task_start_ms', 'correct_submission_time_ms']
+
+
+def _get_frame_path(path, name):
+    return path.with_name('{}_{}'.format(path.name, name))
+
+
+def save_parsed_files(parsed_files, path):
+    """
+    store the parsed log files of a team (path -> (log, skipped info), see TeamLogFileReader.read_files) as columnar frames
+    with compact dtypes: one frame with a row per file, and the results and the events of all the files concatenated.
+    Every file keeps the names and the dtypes of its own columns, so that load_parsed_files returns the same logs.
+    The values of the object columns are stored as json
+    path: prefix of the frames
+    """
+    files = {k: [] for k in ['path', 'skipped'] + LOG_VALUES + ['results', 'events', 'num_results', 'num_events']}
+    parts = {'results': _ColumnBuffer(), 'events': _ColumnBuffer()}
+    for file_path, (log, skipped) in parsed_files.items():
+        files['path'].append(file_path)
+        files['skipped'].append(skipped)
+        for k in LOG_VALUES:
+            files[k].append(log[k] if log is not None else np.nan)
+        for part, buffer in parts.items():
+            columns = log[part] if log is not None else None
+            files[part].append(None if columns is None else json.dumps([[k, c.dtype.str] for k, c in columns.items()]))
+            files['num_{}'.format(part)].append(0 if columns is None else len(next(iter(columns.values()))))
+            if columns is not None:
+                buffer.append(columns)
+
+    files = pd.DataFrame(files).astype({'results': 'category', 'events': 'category'})
+    columnar.save_frame(to_compact_dtypes(files), _get_frame_path(path, 'files'))
+    for part, buffer in parts.items():
+        df = pd.DataFrame(buffer.pop_columns())
+        df = df.assign(**{k: [json.dumps(v) for v in c] for k, c in df.items() if c.dtype == object})
+        # the integers in the smallest dtype, the dtypes of every file are restored by load_parsed_files
+        df = df.assign(**{k: pd.to_numeric(c, downcast='integer') for k, c in df.items() if pd.api.types.is_integer_dtype(c)})
+        columnar.save_frame(to_compact_dtypes(df), _get_frame_path(path, part))
+
+
+def _decode_column(column):
+    # inverse of the conversions of save_parsed_files and to_compact_dtypes
+    if isinstance(column.dtype, pd.CategoricalDtype) and column.cat.categories.dtype == object:
+        categories = np.fromiter((json.loads(c) for c in column.cat.categories), dtype=object, count=len(column.cat.categories))
+        return categories[column.cat.codes.to_numpy()]
+    if column.dtype == object:
+        return np.fromiter((json.loads(v) for v in column), dtype=object, count=len(column))
+    if column.name == 'rank' or column.name.startswith('rank_'):
+        return np.where(column == RANK_NOT_FOUND, np.inf, column)
+    return np.asarray(column)
+
+
+def load_parsed_files(path):
+    """
+    load the parsed log files of a team stored with save_parsed_files
+    """
+    files = columnar.load_frame(_get_frame_path(path, 'files'))
+    parts = {}
+    for part in ['results', 'events']:
+        df = columnar.load_frame(_get_frame_path(path, part))
+        offsets = np.cumsum(files['num_{}'.format(part)].to_numpy())[:-1]
+        parts[part] = {k: np.split(_decode_column(c), offsets) for k, c in df.items()}
+
+    parsed_files = {}
+    for i, (file_path, skipped, task) in enumerate(zip(files['path'], files['skipped'], files['task'])):
+        log = None
+        if isinstance(task, str):
+            log = {'timestamp': int(files['timestamp'].iat[i]), 'user': int(files['user'].iat[i]), 'task': task,
+                   'elapsed_since_task_start_ms': int(files['elapsed_since_task_start_ms'].iat[i])}
+            cst = files['correct_submission_time_ms'].iat[i]
+            log['correct_submission_time_ms'] = int(cst) if cst == cst else np.nan
+            for part, columns in parts.items():
+                spec = files[part].iat[i]
+                log[part] = None if not isinstance(spec, str) else {k: columns[k][i].astype(dtype, copy=False) for k, dtype in json.loads(spec)}
+        parsed_files[file_path] = (log, skipped)
+    return parsed_files
+
+
+class _ColumnBuffer:
+    """
+    growable table made of chunks of typed columns, concatenated only once
+    """
+    def __init__(self):
+        self.chunks = {}
+        self.lengths = []
+
+    def append(self, columns):
+        length = len(next(iter(columns.values())))
+        for k in columns:
+            if k not in self.chunks:
+                # a column missing in all the previous chunks
+                self.chunks[k] = [np.full(l, np.nan) for l in self.lengths]
+        for k, chunks in self.chunks.items():
+            chunks.append(columns[k] if k in columns else np.full(length, np.nan))
+        self.lengths.append(length)
+
+    def pop_columns(self):
+        """
+        concatenate the chunks of every column, and empty the table. The chunks of a column are released as soon as it is concatenated
+        """
+        columns = {}
+        for k in list(self.chunks.keys()):
+            columns[k] = np.concatenate(self.chunks.pop(k))
+        return columns
+
+
+class TeamLogAccumulator:
+    """
+    Collect the (parsed) results and the raw events of the log files of a team as typed columns (see TeamLogFileReader.read_files),
+    and build the DataFrames of the whole team at once, without creating a DataFrame for every log file
+    """
+    def __init__(self):
+        self.results = _ColumnBuffer()
+        self.events = _ColumnBuffer()
+        # timestamp, user, task, ... of the logs with results and of the logs with events
+        self.results_logs = []
+        self.events_logs = []
+
+    def add(self, log):
+        if log['results'] is not None:
+            self.results.append(log['results'])
+            self.results_logs.append(log)
+        if log['events'] is not None:
+            self.events.append(log['events'])
+            self.events_logs.append(log)
+
+    def _get_log_values(self, logs, lengths, key):
+        # broadcast a value of every log to all the rows of the log (strings as categoricals)
+        values = [log[key] for log in logs]
+        if isinstance(values[0], str):
+            codes, categories = pd.factorize(np.array(values, dtype=object))
+            return pd.Categorical.from_codes(np.repeat(codes, lengths), categories)
+        return np.repeat(np.array(values), lengths)
+
+    def get_dataframes(self, team, events_fn):
+        """
+        build the DataFrames with the results and the events of the team
+        events_fn: function parsing the raw events (see TeamLogParser)
+        """
+        return self.get_results_dataframe(team), self.get_events_dataframe(team, events_fn)
+
+    def get_results_dataframe(self, team):
+        results = pd.DataFrame(self.results.pop_columns())
+        for k in ['timestamp', 'user', 'task']:
+            results[k] = self._get_log_values(self.results_logs, self.results.lengths, k)
+        results['team'] = pd.Categorical.from_codes(np.zeros(len(results), dtype=np.int8), [team])
+        return results
+
+    def get_events_dataframe(self, team, events_fn):
+        events = events_fn(pd.DataFrame(self.events.pop_columns()))
+
+        # collect non-standard attributes of the events of every log in a single column "additionals"
+        additionals = []
+        for log, length in zip(self.events_logs, self.events.lengths):
+            non_standard_attrs = {k: c.tolist() for k, c in log['events'].items() if k not in events.columns}
+            additionals.extend(_to_json({k: values[i] for k, values in non_standard_attrs.items()}) for i in range(length))
+        events['additionals'] = additionals
+
+        for k in ['timestamp', 'elapsed_since_task_start_ms', 'correct_submission_time_ms', 'user', 'task']:
+            events[k] = self._get_log_values(self.events_logs, self.events.lengths, k)
+        events['team'] = pd.Categorical.from_codes(np.zeros(len(events), dtype=np.int8), [team])
+        return events
+
+
+def _to_json(attrs):
+    # nan (missing attributes) as null, and the same escaping of pandas to_json
+    attrs = {k: None if isinstance(v, float) and v != v else v for k, v in attrs.items()}
+    return json.dumps(attrs, separators=(',', ':')).replace('/', '\\/')
+
+
+# reader of the worker processes, set once by _init_log_file_reader
+_log_file_reader = None
+
+def _init_log_file_reader(log_file_reader):
+    global _log_file_reader
+    _log_file_reader = log_file_reader
+
+
+def _read_log_files(log_files):
+    return _log_file_reader.read_files(log_files)
@@ -2,7 +2,6 @@
 import bisect
 from common.tasks import Tasks
 import numpy as np
-from copy import deepcopy
 
 from common.teams import Teams
 
@@ -29,10 +28,13 @@ class RunReader:
 
         # collects information about tasks and teams
         self.teams = self.build_teams()
-        # collect task info and correct_submission_time from every team
-        self.tasks, self.csts  = self.build_tasks()
-
-
+        # collect task info and submissions
+        self.tasks = self.build_tasks()
+        self.tasks.finalize()
+        # first correct/wrong submission time and number of submissions from every team on every task
+        self.submission_stats = self.tasks.submissions.get_stats(
+            self.teams.get_team_names(), self.tasks.tasks_df['name'].unique())
+        self.csts = self.build_csts()
 
     def build_tasks(self):
         """
@@ -46,9 +48,22 @@ class RunReader:
         """
         return NotImplementedError
 
+    def build_csts(self):
+        """
+        correct submission times as a dict team -> task -> timestamp (-1 if the team never submitted a correct result)
+        """
+        first_correct = self.submission_stats['first_correct']
+        csts = {k: {} for k in self.teams.get_team_names()}
+        for (team, task), cst in zip(first_correct.index, first_correct.tolist()):
+            csts[team][task] = cst
+        return csts
+
     def get_csts(self):
         return self.csts
 
+    def get_submission_stats(self):
+        return self.submission_stats
+
     def get_tasks(self):
         return self.tasks
     
@@ -81,9 +96,6 @@ class RunReader2021(RunReader):
         """
         Mine tasks from the run file, including the correct video, the predefined shot ids, the target shot start and end in milliseconds #
        """
-        team_ids = self.teams.get_team_ids()
-        tasks = {}
-        csts = {k: {} for k in self.teams.get_team_names()} #csts = {}
         tasks = Tasks(self.v3c_videos)
 
         for t in self.run['tasks']:
@@ -105,22 +117,10 @@ class RunReader2021(RunReader):
                 # task = Task(t['started'], t['ended'], t['duration'], t['position'], t['uid'], t['description']['taskType']['name'])
                 # task.add_correct_shot_and_video(shotId, videoId)
                 # tasks[task.name] = task
-                # for every task, remember which was the correct submission time from each team in csts
-                remaining_team_ids = set(team_ids)
-                submissions = []
+                # collect the submissions, correct submission times are computed from them by the RunReader
                 for s in t['submissions']:
                     team_name = self.teams.get_teamname_from_id(s['teamId']['string'])
-                    ss = deepcopy(s)
-                    ss['teamName'] = team_name
-                    submissions.append(ss)
-                    if s['status'] == 'CORRECT' and s['teamId']['string'] in remaining_team_ids and len(
-                            remaining_team_ids) > 0:
-                        csts[team_name][task_name] = s['timestamp']
-                        remaining_team_ids.remove(s['teamId']['string'])
-
-                # the remaining teams have not found the correct result, put -1
-                for r in remaining_team_ids:
-                    csts[self.teams.get_teamname_from_id(r)][task_name] = -1
+                    tasks.add_submission(task_name, team_name, s)
 
                 tasks.add_task_vbs2022(
                     task_name,
@@ -132,11 +132,10 @@ class RunReader2021(RunReader):
                     task_type,
                     videoId,
                     target_start_ms,
-                    target_end_ms,
-                    submissions
+                    target_end_ms
                 )
 
-        return tasks,csts
+        return tasks
 
 
 
@@ -157,9 +156,6 @@ class RunReader2022(RunReader):
         """
         Mine tasks from the run file, including the correct video, the predefined shot ids, the target shot start and end in milliseconds #
         """
-        team_ids = self.teams.get_team_ids()
-        csts = {k: {} for k in self.teams.get_team_names()}
-
         tasks = Tasks(self.v3c_videos)
 
         for t in self.run['tasks']:
@@ -174,22 +170,10 @@ class RunReader2022(RunReader):
                 target_start_ms = int(t['description']['target']['temporalRange']['start']['millisecond'])  # start time of TARGET video segment
                 target_end_ms = int(t['description']['target']['temporalRange']['end']['millisecond']) # end time of TARGET video segment
 
-                # for every task, remember which was the correct submission time from each team in csts
-                remaining_team_ids = set(team_ids)
-                submissions=[]
+                # collect the submissions, correct submission times are computed from them by the RunReader
                 for s in t['submissions']:
                     team_name = self.teams.get_teamname_from_id(s['teamId']['string'])
-                    ss = deepcopy(s)
-                    ss['teamName'] = team_name
-                    submissions.append(ss)
-                    if s['status'] == 'CORRECT' and s['teamId']['string'] in remaining_team_ids and len(
-                            remaining_team_ids) > 0:
-                        csts[team_name][taskname] = s['timestamp']
-                        remaining_team_ids.remove(s['teamId']['string'])
-
-                # the remaining teams have not found the correct result, put -1
-                for r in remaining_team_ids:
-                    csts[self.teams.get_teamname_from_id(r)][taskname] = -1
+                    tasks.add_submission(taskname, team_name, s)
 
                 task_started=t['started']+5000 # the time when the countdown reached 0 and the first hint was displayed
                 #note t['started']=the time when everybody was confirmed to be ready and the countdown for a task had started
@@ -203,11 +187,10 @@ class RunReader2022(RunReader):
                     t['description']['taskType']['name'],
                     videoId,
                     target_start_ms,
-                    target_end_ms,
-                    submissions
+                    target_end_ms
                 )
 
-        return tasks, csts
+        return tasks
 
     def build_teams(self):
         teams = Teams()
@@ -227,9 +210,6 @@ class RunReaderVbse2022(RunReader):
         """
         Mine tasks from the run file, including the correct video, the predefined shot ids, the target shot start and end in milliseconds #
         """
-        team_ids = self.teams.get_team_ids()
-        csts = {k: {} for k in self.teams.get_team_names()}
-
         tasks = Tasks(self.v3c_videos)
 
         for t in self.run['tasks']:
@@ -244,22 +224,10 @@ class RunReaderVbse2022(RunReader):
             target_end_ms = int(t['description']['target']['temporalRange']['end'][
                                     'millisecond'])  # end time of TARGET video segment
 
-            # for every task, remember which was the correct submission time from each team in csts
-            remaining_team_ids = set(team_ids)
-            submissions = []
+            # collect the submissions, correct submission times are computed from them by the RunReader
             for s in t['submissions']:
                 team_name = self.teams.get_teamname_from_id(s['teamId']['string'])
-                ss = deepcopy(s)
-                ss['teamName'] = team_name
-                submissions.append(ss)
-                if s['status'] == 'CORRECT' and s['teamId']['string'] in remaining_team_ids and len(
-                        remaining_team_ids) > 0:
-                    csts[team_name][taskname] = s['timestamp']
-                    remaining_team_ids.remove(s['teamId']['string'])
-
-            # the remaining teams have not found the correct result, put -1
-            for r in remaining_team_ids:
-                csts[self.teams.get_teamname_from_id(r)][taskname] = -1
+                tasks.add_submission(taskname, team_name, s)
 
             task_started = t['started'] + 5000# the time when the countdown reached 0 and the first hint was displayed
                 #note t['started']=the time when everybody was confirmed to be ready and the countdown for a task had started
@@ -276,11 +244,10 @@ class RunReaderVbse2022(RunReader):
                 t['description']['target']['item']['fps'],
                 target_start_ms,
                 target_end_ms,
-                submissions,
                 t['description']['hints']
             )
 
-        return tasks, csts
+        return tasks
 
     def build_teams(self):
         teams = Teams()
@@ -300,9 +267,6 @@ class RunReader2023(RunReader):
         """
         Mine tasks from the run file, including the correct video, the predefined shot ids, the target shot start and end in milliseconds #
         """
-        team_ids = self.teams.get_team_ids()
-        csts = {k: {} for k in self.teams.get_team_names()}
-
         tasks = Tasks(self.v3c_videos)
 
         for t in self.run['tasks']:
@@ -317,22 +281,10 @@ class RunReader2023(RunReader):
                 target_start_ms = int(t['description']['target']['temporalRange']['start']['millisecond'])  # start time of TARGET video segment
                 target_end_ms = int(t['description']['target']['temporalRange']['end']['millisecond']) # end time of TARGET video segment
 
-                # for every task, remember which was the correct submission time from each team in csts
-                remaining_team_ids = set(team_ids)
-                submissions=[]
+                # collect the submissions, correct submission times are computed from them by the RunReader
                 for s in t['submissions']:
                     team_name = self.teams.get_teamname_from_id(s['teamId']['string'])
-                    ss = deepcopy(s)
-                    ss['teamName'] = team_name
-                    submissions.append(ss)
-                    if s['status'] == 'CORRECT' and s['teamId']['string'] in remaining_team_ids and len(
-                            remaining_team_ids) > 0:
-                        csts[team_name][taskname] = s['timestamp']
-                        remaining_team_ids.remove(s['teamId']['string'])
-
-                # the remaining teams have not found the correct result, put -1
-                for r in remaining_team_ids:
-                    csts[self.teams.get_teamname_from_id(r)][taskname] = -1
+                    tasks.add_submission(taskname, team_name, s)
 
                 task_started=t['started']+5000 # the time when the countdown reached 0 and the first hint was displayed
                 #note t['started']=the time when everybody was confirmed to be ready and the countdown for a task had started
@@ -346,11 +298,10 @@ class RunReader2023(RunReader):
                     t['description']['taskType']['name'],
                     videoId,
                     target_start_ms,
-                    target_end_ms,
-                    submissions
+                    target_end_ms
                 )
 
-        return tasks, csts
+        return tasks
 
     def build_teams(self):
         teams = Teams()
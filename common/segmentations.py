@@ -0,0 +1,48 @@
+from pathlib import Path
+from common.videos import Videos
+
+# known segmentations of the V3C dataset, and the files they are loaded from
+SEGMENTATIONS = {
+    'msb': ['data/v3c1_frame_segments.csv', 'data/v3c2_frame_segments.csv'],   # official master shot boundaries
+    'cineast': ['data/v3c1_2_cineast_segments.csv']     # segments used by vitrivr (see scripts/vitrivr_convert_segments.py)
+}
+
+# segmentation used by the results logged by each team, for each version. Teams not listed here use msb
+TEAM_SEGMENTATIONS = {
+    '2022': {'vitrivr': 'cineast'}
+}
+
+# process-wide registry of the loaded segmentations, keyed by their source files
+_registry = {}
+
+
+def get_videos(v3c_segments_files, fps_file, cache_path='cache/v3c_segments', lazy=False):
+    """
+    get the Videos for the given source files, loading them only the first time.
+    The returned object is shared by all the callers, so it must be used read-only
+    """
+    key = (
+        tuple(str(Path(f).resolve()) for f in v3c_segments_files),
+        str(Path(fps_file).resolve()),
+        cache_path,
+        lazy
+    )
+    if key not in _registry:
+        _registry[key] = Videos(v3c_segments_files, fps_file, cache_path=cache_path, lazy=lazy)
+    return _registry[key]
+
+
+def get_segmentation(name, fps_file, **kwargs):
+    """
+    get the Videos of a known segmentation (see SEGMENTATIONS)
+    """
+    if name not in SEGMENTATIONS:
+        raise ValueError('Segmentation {} not recognized!'.format(name))
+    return get_videos(SEGMENTATIONS[name], fps_file, **kwargs)
+
+
+def get_team_segmentation(version, team):
+    """
+    get the name of the segmentation used by the results of a team
+    """
+    return TEAM_SEGMENTATIONS.get(version, {}).get(team, 'msb')
@@ -0,0 +1,145 @@
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import pickle
+
+snapshot_version = 1   # bump when the layout of the snapshots changes
+
+# hashes of the files already hashed by this process, by (path, size, modification time)
+_file_hashes = {}
+
+
+def get_file_hash(path, chunk_size=1 << 20):
+    """
+    md5 of the content of a file, read in chunks
+    """
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_hash_record(record_file):
+    if record_file is None or not Path(record_file).exists():
+        return {}
+    try:
+        with open(record_file) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning('Cannot read the file hashes in {} ({}). Hashing the files again'.format(record_file, e))
+        return {}
+
+
+def _save_hash_record(record_file, record):
+    record_file = Path(record_file)
+    try:
+        record_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = record_file.with_name('{}.tmp{}'.format(record_file.name, os.getpid()))
+        with open(tmp_file, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_file, record_file)
+    except OSError as e:
+        logging.warning('Cannot save the file hashes in {} ({})'.format(record_file, e))
+
+
+def get_file_hashes(files, record_file=None):
+    """
+    md5 of the content of every file (see get_file_hash). A file is read again only if its size or its modification time
+    changed since it was hashed: the hashes are kept in memory and, if record_file is not None, stored in record_file
+    together with the size and the modification time of the files
+    """
+    record = _load_hash_record(record_file)
+    changed = False
+    hashes = []
+    for f in files:
+        path = str(Path(f).resolve())
+        stat = os.stat(path)
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        if key not in _file_hashes:
+            previous = record.get(path, {})
+            same_file = previous.get('size') == entry['size'] and previous.get('mtime_ns') == entry['mtime_ns']
+            _file_hashes[key] = previous['md5'] if same_file else get_file_hash(path)
+        entry['md5'] = _file_hashes[key]
+        if record.get(path) != entry:
+            record[path] = entry
+            changed = True
+        hashes.append(entry['md5'])
+    if record_file is not None and changed:
+        _save_hash_record(record_file, record)
+    return hashes
+
+
+def get_snapshot_key(files, modules, params=None, record_file=None):
+    """
+    compute the key identifying a snapshot: a hash of the content of the input files, of the source code of the
+    modules that produce the snapshot, and of any other parameter. The key does not depend on the location or on the
+    modification time of the files, so copying or checking out the same files again keeps the snapshot valid
+    files: list of input files
+    modules: list of python modules whose code is used to build the snapshot
+    params: any other value (with a stable repr) the snapshot depends on
+    record_file: where the hashes of the files are stored, so that only the changed files are read (see get_file_hashes)
+    """
+    h = hashlib.md5()
+    h.update('{}\n'.format(snapshot_version).encode())
+    for file_hash in get_file_hashes(files, record_file):
+        h.update('{}\n'.format(file_hash).encode())
+    for m in modules:
+        h.update(Path(m.__file__).read_bytes())
+    h.update(repr(params).encode())
+    return h.hexdigest()
+
+
+class _SnapshotPickler(pickle.Pickler):
+    # objects in shared are not stored in the snapshot, only a reference to them
+    def __init__(self, f, shared):
+        super().__init__(f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared_ids = {id(obj): name for name, obj in shared.items()}
+
+    def persistent_id(self, obj):
+        return self.shared_ids.get(id(obj))
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, f, shared):
+        super().__init__(f)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        return self.shared[pid]
+
+
+def load_snapshot(snapshot_file, key, shared={}):
+    """
+    load the object stored in snapshot_file. Returns None if the snapshot is missing or its key is different
+    shared: objects that are referenced (by name) but not stored in the snapshot, they are taken from here
+    """
+    snapshot_file = Path(snapshot_file)
+    if not snapshot_file.exists():
+        return None
+    try:
+        with open(snapshot_file, 'rb') as f:
+            if pickle.load(f) != key:
+                logging.info('Snapshot {} is outdated. Rebuilding it'.format(snapshot_file))
+                return None
+            return _SnapshotUnpickler(f, shared).load()
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError) as e:
+        logging.warning('Cannot load snapshot {} ({}). Rebuilding it'.format(snapshot_file, e))
+        return None
+
+
+def save_snapshot(snapshot_file, key, obj, shared={}):
+    """
+    store obj in snapshot_file, together with its key (see load_snapshot)
+    """
+    snapshot_file = Path(snapshot_file)
+    snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+    # written to a temporary file first, so that an interrupted write is never considered valid
+    tmp_file = snapshot_file.with_suffix('.tmp')
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(key, f)
+        _SnapshotPickler(f, shared).dump(obj)
+    os.replace(tmp_file, snapshot_file)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+
+class Submissions:
+    """
+    Columnar table with the submissions of a run, one row per submission
+    """
+    columns = ['task', 'team', 'team_id', 'member_id', 'timestamp', 'status', 'item', 'start', 'end']
+
+    def __init__(self):
+        # submissions are appended column-wise and the table is built on first access
+        self._columns = {c: [] for c in self.columns}
+        self._submissions_df = None
+
+    def add_submission(self, task_name, team_name, submission):
+        """
+        append a submission (a dict from the run file). The dict is only read, never copied or stored
+        """
+        item = submission.get('item') or {}
+        self._columns['task'].append(task_name)
+        self._columns['team'].append(team_name)
+        self._columns['team_id'].append(submission['teamId']['string'])
+        self._columns['member_id'].append((submission.get('memberId') or {}).get('string'))
+        self._columns['timestamp'].append(submission['timestamp'])
+        self._columns['status'].append(submission['status'])
+        self._columns['item'].append(item.get('name'))
+        self._columns['start'].append(submission.get('start'))
+        self._columns['end'].append(submission.get('end'))
+        self._submissions_df = None
+
+    @property
+    def submissions_df(self):
+        if self._submissions_df is None:
+            df = pd.DataFrame(self._columns, columns=self.columns)
+            df['timestamp'] = df['timestamp'].astype('int64')
+            df['start'] = df['start'].astype('Int64')
+            df['end'] = df['end'].astype('Int64')
+            self._submissions_df = df
+        return self._submissions_df
+
+    def get_task_submissions(self, task_name):
+        df = self.submissions_df
+        return df[df['task'] == task_name]
+
+    def get_stats(self, team_names, task_names):
+        """
+        aggregate, in a single pass over the table, the submissions of every (team, task) pair.
+        Rows are considered in run order, so "first" means the first one reported in the run file.
+        team_names, task_names: the teams and tasks to aggregate (pairs without submissions are included too)
+        returns a DataFrame indexed by (team, task) with columns:
+            first_correct: timestamp of the first CORRECT submission, -1 if there is none
+            first_wrong: timestamp of the first WRONG submission, -1 if there is none
+            submissions: number of submissions
+        """
+        df = self.submissions_df
+        team_index = pd.Index(team_names)
+        task_index = pd.Index(task_names)
+        num_cells = len(team_index) * len(task_index)
+
+        # dense (team x task) cell of every submission, submissions of unknown teams or tasks are skipped
+        team_idxs = team_index.get_indexer(df['team'])
+        task_idxs = task_index.get_indexer(df['task'])
+        known = (team_idxs >= 0) & (task_idxs >= 0)
+        cells = (team_idxs * len(task_index) + task_idxs)[known]
+        timestamps = df['timestamp'].to_numpy()[known]
+        status = df['status'].to_numpy()[known]
+
+        stats = {'submissions': np.bincount(cells, minlength=num_cells)}
+        for column, value in [('first_correct', 'CORRECT'), ('first_wrong', 'WRONG')]:
+            mask = status == value
+            # np.unique returns the position of the first occurrence of every cell
+            found_cells, first_idxs = np.unique(cells[mask], return_index=True)
+            stats[column] = np.full(num_cells, -1, dtype=np.int64)
+            stats[column][found_cells] = timestamps[mask][first_idxs]
+
+        index = pd.MultiIndex.from_product([team_index, task_index], names=['team', 'task'])
+        return pd.DataFrame(stats, index=index)[['first_correct', 'first_wrong', 'submissions']]
@@ -1,21 +1,111 @@
 import pandas as pd
 import numpy as np
-import bisect
+from types import MappingProxyType
+
+from common.submissions import Submissions
 
 class Tasks:
     """
     Store all the necessary information to a task
     """
 
-    def __init__(self, v3c_videos):
+    def __init__(self, v3c_videos, target_shot_margins=[0, 5]):
+        """
+        target_shot_margins [list]: temporal margins (in seconds) of expansion of the target segment, used to precompute the ranges of correct shots
+        """
         self.v3c_videos = v3c_videos
-        self.tasks_df = pd.DataFrame()
+        self.target_shot_margins = target_shot_margins
+
+        # tasks are collected as rows and the table is built in one shot by finalize()
+        self._rows = []
+        self._rows_with_shot_ranges = []
+        self._tasks_df = None
+        self._records = {}
+
+        # submissions are kept in a separate columnar table, referenced by task name
+        self.submissions = Submissions()
+
+    def __getstate__(self):
+        # read-only records cannot be pickled, store them as plain dicts
+        state = self.__dict__.copy()
+        state['_records'] = {name: dict(record) for name, record in self._records.items()}
+        return state
+
+    def __setstate__(self, state):
+        state['_records'] = {name: MappingProxyType(record) for name, record in state['_records'].items()}
+        self.__dict__.update(state)
+
+    @property
+    def tasks_df(self):
+        if self._tasks_df is None:
+            self.finalize()
+        return self._tasks_df
+
+    def _add_task(self, row, compute_shot_ranges=True):
+        if compute_shot_ranges:
+            self._rows_with_shot_ranges.append(len(self._rows))
+        self._rows.append(row)
+        self._tasks_df = None
+
+    def _add_correct_shot_ranges(self):
+        """
+        compute, in a single batch, the ranges of shots overlapping the target segment of every task, for every margin.
+        The correct shots with margin m are the ones with correct_shots_start_margin_m <= shotId < correct_shots_stop_margin_m
+        """
+        rows = [self._rows[i] for i in self._rows_with_shot_ranges]
+        n = len(self.target_shot_margins)
+        starts, stops = self.v3c_videos.get_shot_ranges_from_videos_and_segments(
+            np.repeat([r['correct_video'] for r in rows], n),
+            np.repeat([r['target_start_ms'] for r in rows], n),
+            np.repeat([r['target_end_ms'] for r in rows], n),
+            margins=np.tile([m * 1000 for m in self.target_shot_margins], len(rows)),
+            unit='milliseconds')
+
+        starts, stops = starts.reshape(-1, n), stops.reshape(-1, n)
+        for row, row_starts, row_stops in zip(rows, starts, stops):
+            for m, start, stop in zip(self.target_shot_margins, row_starts, row_stops):
+                row['correct_shots_start_margin_{}'.format(m)] = int(start)
+                row['correct_shots_stop_margin_{}'.format(m)] = int(stop)
+        self._rows_with_shot_ranges = []
+
+    def finalize(self):
+        """
+        build the task table column-wise and the index from task names to (read-only) task records.
+        It is called automatically on the first access after some tasks have been added
+        """
+        if len(self._rows_with_shot_ranges) > 0:
+            self._add_correct_shot_ranges()
+        self._tasks_df = pd.DataFrame(self._rows)
+
+        self._records = {}
+        for record in self._tasks_df.to_dict('records'):
+            self._records.setdefault(record['name'], MappingProxyType(record))
+
+        # interval index: start and end times of the tasks, ordered by start time
+        if len(self._tasks_df) > 0:
+            starts = self._tasks_df['started'].to_numpy(dtype=np.int64)
+            self._sorting_idxs = starts.argsort(kind='stable')
+            self._starts = starts[self._sorting_idxs]
+            self._ends = self._tasks_df['ended'].to_numpy(dtype=np.int64)[self._sorting_idxs]
+        else:
+            self._sorting_idxs = self._starts = self._ends = np.zeros(0, dtype=np.int64)
+
+    def add_submission(self, task_name, team_name, submission):
+        self.submissions.add_submission(task_name, team_name, submission)
+
+    @property
+    def submissions_df(self):
+        return self.submissions.submissions_df
 
-    def add_task_vbs2022(self, name, started, ended, duration, position, uid, taskType, correct_video, target_start_ms, target_end_ms, submissions=[]):
+    def get_task_submissions(self, task_name):
+        """
+        get the submissions (as rows of submissions_df) made during the given task
+        """
+        return self.submissions.get_task_submissions(task_name)
+
+    def add_task_vbs2022(self, name, started, ended, duration, position, uid, taskType, correct_video, target_start_ms, target_end_ms):
         correct_shot = self.v3c_videos.get_shot_from_video_and_frame(correct_video, target_start_ms, unit='milliseconds')
-        correct_shots = self.v3c_videos.get_shots_from_video_and_segment(correct_video, target_start_ms,target_end_ms,unit='milliseconds')
-        #TODO substitute correct_shot with correct_shots (that is a list)
-        self.tasks_df = self.tasks_df.append({
+        self._add_task({
             'name': name,
             'started': started,
             'ended': ended,
@@ -23,22 +113,17 @@ class Tasks:
             'position': position,
             'uid': uid,
             'task_type': taskType,
-            'correct_video': correct_video,
+            'correct_video': int(correct_video),
             'correct_shot': correct_shot,
             'target_start_ms': target_start_ms,
-            'target_end_ms': target_end_ms ,
-            'submissions':submissions}, ignore_index=True
+            'target_end_ms': target_end_ms}
         )
-        self.tasks_df['correct_video'] = self.tasks_df['correct_video'].astype(int)
 
     def add_task_vbse2022(self, name, started, ended, duration, position, uid, taskType, correct_video, fps, target_start_ms,
-                 target_end_ms, submissions=[], hints=[]):
+                 target_end_ms, hints=[]):
         correct_shot = self.v3c_videos.get_shot_from_video_and_frame(correct_video, target_start_ms,
                                                                      unit='milliseconds')
-        correct_shots = self.v3c_videos.get_shots_from_video_and_segment(correct_video, target_start_ms, target_end_ms,
-                                                                         unit='milliseconds')
-        # TODO substitute correct_shot with correct_shots (that is a list)
-        self.tasks_df = self.tasks_df.append({
+        self._add_task({
             'name': name,
             'started': started,
             'ended': ended,
@@ -46,17 +131,16 @@ class Tasks:
             'position': position,
             'uid': uid,
             'task_type': taskType,
-            'correct_video': correct_video,
+            'correct_video': int(correct_video),
             'fps':fps,
             'correct_shot': correct_shot,
             'target_start_ms': target_start_ms,
             'target_end_ms': target_end_ms,
-            'submissions': submissions,
-            'hints':hints}, ignore_index=True
+            'hints':hints}
         )
-        self.tasks_df['correct_video'] = self.tasks_df['correct_video'].astype(int)
-    def add_task_vbs2023(self, name, started, ended, duration, position, uid, taskType, correct_video, target_start_ms, target_end_ms, submissions=[]):
-        self.tasks_df = self.tasks_df.append({
+
+    def add_task_vbs2023(self, name, started, ended, duration, position, uid, taskType, correct_video, target_start_ms, target_end_ms):
+        self._add_task({
             'name': name,
             'started': started,
             'ended': ended,
@@ -66,33 +150,87 @@ class Tasks:
             'task_type': taskType,
             'correct_video': correct_video,
             'target_start_ms': target_start_ms,
-            'target_end_ms': target_end_ms ,
-            'submissions':submissions}, ignore_index=True
+            'target_end_ms': target_end_ms},
+            compute_shot_ranges=False
         )
-        self.tasks_df['correct_video'] = self.tasks_df['correct_video']
 
-    def get_task_from_timestamp(self, timestamp):
-        names, starts, ends = zip(*self.tasks_df[['name', 'started', 'ended']].values.tolist())
-        sorting_idxs = np.array(starts).argsort()
-        starts = np.array(starts)[sorting_idxs]
-        ends = np.array(ends)[sorting_idxs]
-        if timestamp < starts[0] or timestamp > ends[-1]:
-            # outside limits, not a valid timestamp
-            return None
-        
-        f_start_idx = bisect.bisect_right(starts.tolist(), timestamp) - 1
-        f_end_idx = bisect.bisect_right(ends.tolist(), timestamp)
+    def get_task_ids_from_timestamps(self, timestamps):
+        """
+        vectorized search of the tasks running at the given timestamps
+        timestamps: array-like of timestamps in milliseconds
+        returns an int64 array with the row of the task inside tasks_df, -1 if the timestamp is outside (or between) tasks
+        """
+        if self._tasks_df is None:
+            self.finalize()
+        timestamps = np.asarray(timestamps)
+        if len(self._starts) == 0:
+            return np.full(len(timestamps), -1, dtype=np.int64)
 
-        if f_end_idx != f_start_idx:
-            # in the middle between two tasks, so not a valid submission
+        f_start_idx = np.searchsorted(self._starts, timestamps, side='right') - 1
+        f_end_idx = np.searchsorted(self._ends, timestamps, side='right')
+
+        # outside limits, or in the middle between two tasks, so not a valid timestamp
+        valid = (f_start_idx == f_end_idx) & (timestamps >= self._starts[0]) & (timestamps <= self._ends[-1])
+        return np.where(valid, self._sorting_idxs[f_start_idx.clip(min=0)], -1)
+
+    def get_task_ids_from_timestamps_with_tolerance(self, timestamps, pre_tolerance=5000, post_tolerance=5000):
+        """
+        vectorized search of the tasks running at the given timestamps, extending every task by pre_tolerance milliseconds
+        before its start and by post_tolerance milliseconds after its end (tasks are [started, ended) intervals)
+        timestamps: array-like of timestamps in milliseconds
+        returns two arrays: the row of the task inside tasks_df (-1 if there is no task, even considering the tolerance),
+        and a boolean mask that is True if the timestamp matched the task only thanks to the tolerance.
+        The whole extended interval [started - pre_tolerance, ended + post_tolerance) is matched: for tasks lasting at least
+        pre_tolerance and post_tolerance this is the same as probing ts, ts + pre_tolerance and ts - post_tolerance with
+        get_task_from_timestamp, while shorter tasks are also matched by the timestamps that fall between these probes.
+        If the extended intervals of many tasks contain the timestamp, the task starting last is returned
+        """
+        timestamps = np.asarray(timestamps)
+        task_ids = self.get_task_ids_from_timestamps(timestamps)
+        only_tolerance = np.zeros(len(timestamps), dtype=bool)
+        if len(self._starts) == 0 or (pre_tolerance == 0 and post_tolerance == 0):
+            return task_ids, only_tolerance
+
+        # visit the tasks starting (with tolerance) before the timestamp, from the last one backwards, until one contains it
+        # or all the remaining ones end (with tolerance) before it
+        missing = np.flatnonzero(task_ids < 0)
+        idx = np.searchsorted(self._starts - pre_tolerance, timestamps[missing], side='right') - 1
+        max_ends = np.maximum.accumulate(self._ends) + post_tolerance
+        while len(missing) > 0:
+            active = idx >= 0
+            active[active] = timestamps[missing[active]] < max_ends[idx[active]]
+            missing, idx = missing[active], idx[active]
+            inside = timestamps[missing] < self._ends[idx] + post_tolerance
+            task_ids[missing[inside]] = self._sorting_idxs[idx[inside]]
+            only_tolerance[missing[inside]] = True
+            missing, idx = missing[~inside], idx[~inside] - 1
+        return task_ids, only_tolerance
+
+    def get_task_from_timestamp_with_tolerance(self, timestamp, pre_tolerance=5000, post_tolerance=5000):
+        """
+        get the task running at the given timestamp (see get_task_ids_from_timestamps_with_tolerance).
+        Returns the task (None if there is no task) and whether the match came only from the tolerance
+        """
+        task_ids, only_tolerance = self.get_task_ids_from_timestamps_with_tolerance([timestamp], pre_tolerance, post_tolerance)
+        if task_ids[0] < 0:
+            return None, False
+        return self.get_task_from_taskname(self.tasks_df['name'].iat[task_ids[0]]), bool(only_tolerance[0])
+
+    def get_task_from_timestamp(self, timestamp):
+        task_id = self.get_task_ids_from_timestamps([timestamp])[0]
+        if task_id < 0:
             return None
-        
-        correct_name = names[sorting_idxs[f_start_idx]]
-        correct_task = self.tasks_df[self.tasks_df['name'] == correct_name]
-        return correct_task.iloc[0].to_dict()
+        return self.get_task_from_taskname(self.tasks_df['name'].iat[task_id])
 
     def get_task_from_taskname(self, name):
-        return self.tasks_df[self.tasks_df['name'] == name].iloc[0].to_dict()
+        """
+        get the (read-only) record of a task. Raises IndexError if there is no task with this name
+        """
+        if self._tasks_df is None:
+            self.finalize()
+        if name not in self._records:
+            raise IndexError('Task {} not found'.format(name))
+        return self._records[name]
 
     # def get_logged_time(self, logged_time):
     #     return (logged_time - self.started) / 1000
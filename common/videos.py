@@ -1,29 +1,290 @@
+from collections import OrderedDict
+from pathlib import Path
 import pandas as pd
-import bisect
+import hashlib
+import json
 import logging
 import numpy as np
+import os
+import shutil
 
 class Videos:
     """
     A helper class for managing V3C videos and their shots
     """
-    def __init__(self, v3c_segments_files, fps_file):
+    columns = ['startframe', 'endframe', 'start', 'end', 'segment']
+    INVALID = -1    # returned by the batch methods for invalid frames
+    store_version = 1   # bump when the layout of the compiled store changes
+
+    def __init__(self, v3c_segments_files, fps_file, cache_path='cache/v3c_segments', lazy=False, max_cached_videos=1000):
         """
-        shots: pandas dataframe containing shots information
+        v3c_segments_files: list of csv files containing shots information (one row per shot)
+        fps_file: csv file containing the FPS of every video
+        cache_path: where to store the compiled (binary, memory-mapped) version of the csv files.
+            The compiled store is rebuilt automatically when the csv files change. If None, the csv files are always parsed
+        lazy: if True, the shots of a video are read from the (memory-mapped) store only the first time the video is used,
+            and kept in a LRU cache of at most max_cached_videos videos. The index spanning all the videos is never built
+        """
+        self.v3c_segments_files = list(v3c_segments_files)
+        self.fps_file = fps_file
+        self.cache_path = cache_path
+        sources = list(v3c_segments_files) + [fps_file]
+        arrays = None
+        if cache_path is not None:
+            store_path = Path(cache_path) / self._get_store_name(sources)
+            arrays = self._load_store(store_path, sources)
+        if arrays is None:
+            arrays = self._read_csv_files(v3c_segments_files, fps_file)
+            if cache_path is not None:
+                try:
+                    self._save_store(store_path, arrays, sources)
+                except OSError as e:
+                    logging.warning('Cannot compile V3C segments in {} ({}). Using the csv files'.format(store_path, e))
+
+        # compact index: one contiguous array per column, plus an offset table so that the shots of
+        # the i-th video are stored in the rows offsets[i]:offsets[i+1]
+        self.video_ids = arrays['video_ids']
+        self.offsets = arrays['offsets']
+        self.shots = {c: arrays[c] for c in self.columns}
+
+        # FPSs, sorted by videoId
+        self.fps_video_ids = arrays['fps_video_ids']
+        self.fps_values = arrays['fps_values']
+
+        # per-column search keys used by the batch lookups, built on first use
+        self._search_keys = {}
+        # dense (video, segment) -> middle frame milliseconds table, built on first use
+        self._segment_times = None
+
+        # per-video LRU cache, only used in lazy mode
+        self.lazy = lazy
+        self.max_cached_videos = max_cached_videos
+        self._video_cache = OrderedDict()
+        self._loaded_videos = set()
+        self._cache_hits = 0
+        self._cache_evictions = 0
+
+    def __reduce__(self):
+        # the index is not pickled: the unpickled object is opened again from the compiled store (e.g., in
+        # worker processes), through the registry of the loaded segmentations
+        from common.segmentations import get_videos
+        return get_videos, (self.v3c_segments_files, self.fps_file, self.cache_path, self.lazy)
+
+    def _read_csv_files(self, v3c_segments_files, fps_file):
+        """
+        parse the csv files and build the arrays of the index
         """
         dfs = []
         for v3cx in v3c_segments_files:
             dfs.append(pd.read_csv(v3cx))
-            
+
         videos = pd.concat(dfs, axis=0)
-        videos = videos.groupby("video")
+        # group the shots of the same video together, keeping their original order inside the video
+        videos = videos.sort_values('video', kind='stable')
 
-        # create a dict of dataframes, where the key is the videoid
-        self.videos = {n:g for n,g in videos}
+        arrays = {}
+        arrays['video_ids'], counts = np.unique(videos['video'].to_numpy(), return_counts=True)
+        arrays['offsets'] = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=arrays['offsets'][1:])
+        arrays.update({c: np.ascontiguousarray(videos[c].to_numpy()) for c in self.columns})
 
-        # create a dict for FPSs
-        fps = pd.read_csv(fps_file, names=['videoId', 'FPS'], index_col='videoId')
-        self.fps = fps.to_dict()
+        fps = pd.read_csv(fps_file, names=['videoId', 'FPS'], index_col='videoId').sort_index()
+        arrays['fps_video_ids'] = fps.index.to_numpy()
+        arrays['fps_values'] = fps['FPS'].to_numpy()
+        return arrays
+
+    @staticmethod
+    def _get_store_name(sources):
+        # different sets of source files (e.g., msb and cineast segmentations) have different stores
+        key = '\n'.join(str(Path(s).resolve()) for s in sources)
+        return hashlib.md5(key.encode()).hexdigest()
+
+    @classmethod
+    def _get_store_manifest(cls, sources):
+        # the store is valid as long as the source files are not modified
+        files = []
+        for s in sources:
+            stat = os.stat(s)
+            files.append({'path': str(Path(s).resolve()), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+        return {'version': cls.store_version, 'sources': files}
+
+    @classmethod
+    def _load_store(cls, store_path, sources):
+        """
+        open the compiled arrays as memory-mapped files. Returns None if the store is missing, outdated or unreadable
+        """
+        manifest_file = store_path / 'manifest.json'
+        if not manifest_file.exists():
+            return None
+        try:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+            arrays = manifest.pop('arrays', [])
+            if manifest != cls._get_store_manifest(sources):
+                logging.info('Compiled V3C segments in {} are outdated. Rebuilding them'.format(store_path))
+                return None
+            return {name: np.load(store_path / '{}.npy'.format(name), mmap_mode='r') for name in arrays}
+        except (OSError, ValueError) as e:
+            logging.warning('Cannot read the compiled V3C segments in {} ({}). Rebuilding them'.format(store_path, e))
+            return None
+
+    @classmethod
+    def _save_store(cls, store_path, arrays, sources):
+        """
+        write the arrays as .npy files, together with the manifest describing the source files.
+        The store is written to a temporary folder first, so that an interrupted compilation is never considered valid
+        """
+        tmp_path = store_path.with_name('{}.tmp{}'.format(store_path.name, os.getpid()))
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        try:
+            manifest = cls._get_store_manifest(sources)
+            manifest['arrays'] = list(arrays.keys())
+            for name, array in arrays.items():
+                np.save(tmp_path / '{}.npy'.format(name), array, allow_pickle=False)
+            with open(tmp_path / 'manifest.json', 'w') as f:
+                json.dump(manifest, f)
+            shutil.rmtree(store_path, ignore_errors=True)
+            os.replace(tmp_path, store_path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def _get_fps(self, videoId):
+        idx = np.searchsorted(self.fps_video_ids, videoId)
+        if idx >= len(self.fps_video_ids) or self.fps_video_ids[idx] != videoId:
+            raise KeyError(videoId)
+        return self.fps_values[idx]
+
+    def _get_video_index(self, videoId):
+        """
+        get the position of the given video inside the shot index
+        """
+        idx = np.searchsorted(self.video_ids, videoId)
+        if idx >= len(self.video_ids) or self.video_ids[idx] != videoId:
+            raise KeyError(videoId)
+        return idx
+
+    def _get_video_bounds(self, videoId):
+        """
+        get the (start, end) rows of the given video inside the shot index
+        """
+        idx = self._get_video_index(videoId)
+        return self.offsets[idx], self.offsets[idx + 1]
+
+    def _get_video_indexes(self, videoIds, ids):
+        """
+        vectorized search of many videoIds inside a sorted array of ids
+        """
+        idxs = np.searchsorted(ids, videoIds)
+        found = idxs < len(ids)
+        found[found] = ids[idxs[found]] == videoIds[found]
+        if not found.all():
+            raise KeyError(np.unique(videoIds[~found]).tolist())
+        return idxs
+
+    def _get_search_keys(self, column):
+        """
+        build a single sorted array of keys for the given column, so that a whole batch of (video, value)
+        queries can be answered with one np.searchsorted. The key of a shot is video_index * span + value - vmin + 1,
+        where span is larger than the range of the column values (values must be sorted inside each video).
+        The keys 0 and span - 1 of every video are free, so that queries out of the range can be clipped to them
+        """
+        if column not in self._search_keys:
+            values = self.shots[column].astype(np.int64)
+            vmin = values.min() if len(values) > 0 else 0
+            span = (values.max() - vmin + 3) if len(values) > 0 else 3
+            video_idxs = np.repeat(np.arange(len(self.video_ids), dtype=np.int64), np.diff(self.offsets))
+            keys = video_idxs * span + (values - vmin + 1)
+            self._search_keys[column] = (keys, vmin, span)
+        return self._search_keys[column]
+
+    def _search_batch(self, videoIds, values, column, side):
+        """
+        vectorized np.searchsorted of every value inside the given column of the shots of the corresponding video
+        """
+        if self.lazy:
+            idxs = np.empty(len(videoIds), dtype=np.int64)
+            for videoId, positions in self._group_by_video(videoIds):
+                idxs[positions] = np.searchsorted(self.get_video_shots(videoId, column), values[positions], side=side)
+            return idxs
+
+        keys, vmin, span = self._get_search_keys(column)
+        video_idxs = self._get_video_indexes(videoIds, self.video_ids)
+        query_keys = video_idxs * span + np.clip(values - vmin + 1, 0, span - 1)
+        # number of shots of the same video before (or at, if side is 'right') the value
+        return np.searchsorted(keys, query_keys, side=side) - self.offsets[video_idxs]
+
+    @staticmethod
+    def _to_int_array(values):
+        """
+        convert an array-like of numbers (or numeric strings) to int64; returns the converted array and
+        the mask of the invalid values (which are set to 0)
+        """
+        values = np.asarray(values)
+        if values.dtype.kind in 'iu':
+            return values.astype(np.int64), np.zeros(len(values), dtype=bool)
+        if values.dtype.kind in 'OU':
+            # fast path for integer strings (e.g., video ids), the other values are converted by pandas
+            try:
+                return values.astype(np.int64), np.zeros(len(values), dtype=bool)
+            except (ValueError, TypeError, OverflowError):
+                pass
+        values = pd.to_numeric(pd.Series(values.astype(object)), errors='coerce').to_numpy(dtype=np.float64)
+        invalid = ~np.isfinite(values)
+        values = np.where(invalid, 0, values).astype(np.int64)
+        return values, invalid
+
+    def _load_video(self, videoId):
+        """
+        get the shots of a video from the LRU cache, reading them from the index if they are not cached
+        """
+        video = self._video_cache.get(videoId)
+        if video is not None:
+            self._cache_hits += 1
+            self._video_cache.move_to_end(videoId)
+            return video
+
+        lo, hi = self._get_video_bounds(videoId)
+        video = {c: np.array(self.shots[c][lo:hi]) for c in self.columns}
+        self._video_cache[videoId] = video
+        self._loaded_videos.add(videoId)
+        if len(self._video_cache) > self.max_cached_videos:
+            self._video_cache.popitem(last=False)
+            self._cache_evictions += 1
+        return video
+
+    def get_stats(self):
+        """
+        statistics about the videos actually loaded (only meaningful in lazy mode)
+        """
+        return {
+            'total_videos': len(self.video_ids),
+            'loaded_videos': len(self._loaded_videos),
+            'cached_videos': len(self._video_cache),
+            'cache_hits': self._cache_hits,
+            'cache_evictions': self._cache_evictions
+        }
+
+    def get_video_shots(self, videoId, column):
+        """
+        get the values of a column (startframe, endframe, start, end, segment) for all the shots of a video.
+        The returned array may be shared with the index, it should not be modified
+        """
+        if self.lazy:
+            return self._load_video(videoId)[column]
+        lo, hi = self._get_video_bounds(videoId)
+        return self.shots[column][lo:hi]
+
+    @staticmethod
+    def _group_by_video(videoIds):
+        """
+        yield (videoId, positions) for every distinct videoId in the array. Used by the batch methods in lazy mode
+        """
+        unique_ids, inverse = np.unique(videoIds, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        splits = np.cumsum(np.bincount(inverse, minlength=len(unique_ids)))[:-1]
+        for videoId, positions in zip(unique_ids, np.split(order, splits)):
+            yield videoId, positions
 
     def get_shot_from_video_and_frame(self, videoId, frame, unit="frames"):
         """
@@ -39,12 +300,10 @@ class Videos:
             logging.warning('Found an invalid frame number in logs. Setting to -1')
             frame = -1
 
-        df = self.videos[videoId]
-        start = df['startframe'] if unit == 'frames' else df['start']
-        start = start.to_list()
+        start = self.get_video_shots(videoId, 'startframe' if unit == 'frames' else 'start')
 
         # efficiently search the id of the shot using binary search
-        idx_after_start = bisect.bisect_right(start, frame)
+        idx_after_start = int(np.searchsorted(start, frame, side='right'))
         return idx_after_start
 
     def get_shots_from_video_and_segment(self, videoId, startpoint, endpoint, unit="milliseconds"):
@@ -59,16 +318,14 @@ class Videos:
             startpoint = int(startpoint) if isinstance(startpoint, str) else startpoint
         except ValueError:
             logging.warning('Found an invalid frame number in logs. Setting to -1')
-            frame = -1
+            startpoint = -1
 
-        df = self.videos[videoId]
-        start = df['startframe'] if unit == 'frames' else df['start']
-        start = start.to_list()
+        start = self.get_video_shots(videoId, 'startframe' if unit == 'frames' else 'start')
 
         # efficiently search the id of the shot using binary search
 
-        id_shot_left = max(bisect.bisect_right(start, startpoint) - 1, 0)  # the smallest shot ID that intersect the target segment
-        id_shot_right = bisect.bisect_left(start, endpoint)   # thet fisrt shot ID greather than id_shot_left that do not intersect the target segment
+        id_shot_left = max(int(np.searchsorted(start, startpoint, side='right')) - 1, 0)  # the smallest shot ID that intersect the target segment
+        id_shot_right = int(np.searchsorted(start, endpoint, side='left'))   # thet fisrt shot ID greather than id_shot_left that do not intersect the target segment
         correct_shots_ids=list(range(id_shot_left,id_shot_right))
         return correct_shots_ids
 
@@ -80,37 +337,167 @@ class Videos:
         except ValueError:
             logging.warning('Found an invalid frame number in logs. Setting to -1')
             return -1
-        fps = self.fps['FPS'][videoId]
+        fps = self._get_fps(videoId)
         time = frame * 1000 / fps
 
-        # max_frames_in_msb = self.videos[videoId]['endframe'].max()
+        # max_frames_in_msb = self.get_video_shots(videoId, 'endframe').max()
         # logging.debug('Submitted frame is {} (total number of frames of video {} is {})'.format(frame, videoId, max_frames_in_msb))
         # if time > max_time_in_msb:
         #     logging.warning('Frame {} (millisecond {}) is out of the video {} length'.format(frame, time, videoId))
 
         return time
 
+    def _get_segment_times(self):
+        """
+        build the dense (video, segment) -> middle frame milliseconds table.
+        The time of segment s of the i-th video is stored at segment_offsets[i] + s (nan if the segment does not exist)
+        """
+        if self._segment_times is None:
+            segments = self.shots['segment'].astype(np.int64)
+            video_idxs = np.repeat(np.arange(len(self.video_ids), dtype=np.int64), np.diff(self.offsets))
+
+            # every video reserves max_segment + 1 slots
+            widths = np.zeros(len(self.video_ids), dtype=np.int64)
+            np.maximum.at(widths, video_idxs, segments + 1)
+            segment_offsets = np.zeros(len(widths) + 1, dtype=np.int64)
+            np.cumsum(widths, out=segment_offsets[1:])
+
+            # TODO: to be consistent with get_shot_time_from_video_and_frame, I use the frame numbers and then convert them to milliseconds using fixed FPS. Is this correct?
+            shot_frames = (self.shots['endframe'] + self.shots['startframe']) / 2
+            fps_idxs = np.searchsorted(self.fps_video_ids, self.video_ids).clip(max=len(self.fps_video_ids) - 1)
+            fps = np.where(self.fps_video_ids[fps_idxs] == self.video_ids, self.fps_values[fps_idxs], np.nan)
+            shot_ms = shot_frames * 1000 / fps[video_idxs]
+
+            # if a segment is repeated inside a video, the first occurrence wins
+            valid = segments >= 0
+            positions, first = np.unique(segment_offsets[video_idxs[valid]] + segments[valid], return_index=True)
+            segment_times = np.full(segment_offsets[-1], np.nan)
+            segment_times[positions] = shot_ms[valid][first]
+
+            self._segment_times = (segment_times, segment_offsets)
+        return self._segment_times
+
+    def _get_video_segment_times(self, videoId):
+        """
+        get the segment -> middle frame milliseconds table of a single video
+        """
+        fps = self._get_fps(videoId)    # raises KeyError for unknown videos, as the other lookups
+        if not self.lazy:
+            segment_times, segment_offsets = self._get_segment_times()
+            idx = self._get_video_index(videoId)
+            return segment_times[segment_offsets[idx]:segment_offsets[idx + 1]]
+
+        video = self._load_video(videoId)
+        if 'segment_times' not in video:
+            segments = video['segment'].astype(np.int64)
+            shot_ms = (video['endframe'] + video['startframe']) / 2 * 1000 / fps
+            valid = segments >= 0
+            positions, first = np.unique(segments[valid], return_index=True)
+            video['segment_times'] = np.full(max(segments.max() + 1, 0) if len(segments) > 0 else 0, np.nan)
+            video['segment_times'][positions] = shot_ms[valid][first]
+        return video['segment_times']
+
     def get_shot_time_from_video_and_segment(self, videoId, segment, method="middle_frame"):
         """
         get middle frame of the given input segment
         """
 
         videoId = int(videoId) if isinstance(videoId, str) else videoId
-        df = self.videos[videoId]
-        row = df[df['segment'] == segment]
-
-        if method == 'middle_frame':
-            # TODO: to be consistent with get_shot_time_from_video_and_frame, I use the frame numbers and then convert them to milliseconds using fixed FPS. Is this correct?
-            shot_frame = (row['endframe'] + row['startframe']) / 2
-        else:
+        if method != 'middle_frame':
             raise ValueError('Method {} not recognized!'.format(method))
 
-        if shot_frame.empty:
-            logging.warning('Video {}: segment {} not found (Max is {})'.format(videoId, segment, self.videos[videoId]['segment'].max()))
-            shot_frame = np.nan
-        else:
-            shot_frame = shot_frame.iat[0]
+        segment_times = self._get_video_segment_times(videoId)
 
-        fps = self.fps['FPS'][videoId]
-        shot_ms = shot_frame * 1000 / fps
+        valid = isinstance(segment, (int, np.integer)) and 0 <= segment < len(segment_times)
+        shot_ms = segment_times[segment] if valid else np.nan
+        if np.isnan(shot_ms):
+            logging.warning('Video {}: segment {} not found (Max is {})'.format(videoId, segment, len(segment_times) - 1))
         return shot_ms
+
+    def get_shots_from_videos_and_frames(self, videoIds, frames, unit="frames"):
+        """
+        vectorized version of get_shot_from_video_and_frame
+        videoIds, frames: array-likes with the same length
+        unit : 'frames' | 'milliseconds'
+        returns an int64 array of shotIds, INVALID where the frame is not a valid number
+        """
+
+        assert unit in ["frames", "milliseconds"]
+        videoIds, _ = self._to_int_array(videoIds)
+        frames, invalid = self._to_int_array(frames)
+        if invalid.any():
+            logging.warning('Found {} invalid frame numbers in logs. Setting to {}'.format(invalid.sum(), self.INVALID))
+
+        shots = self._search_batch(videoIds, frames, 'startframe' if unit == 'frames' else 'start', side='right')
+        shots[invalid] = self.INVALID
+        return shots
+
+    def get_shot_ranges_from_videos_and_segments(self, videoIds, startpoints, endpoints, margins=0, unit="milliseconds"):
+        """
+        vectorized version of get_shots_from_video_and_segment, for many (video, start, end, margin) tuples at once.
+        Every segment is expanded by its margin (same unit of the segment) on both sides
+        videoIds, startpoints, endpoints: array-likes with the same length
+        margins: a number or an array-like with the same length of the others
+        unit : 'frames' | 'milliseconds'
+        returns two int64 arrays (start, stop): the shots overlapping the i-th segment are range(start[i], stop[i])
+        """
+
+        assert unit in ["frames", "milliseconds"]
+        videoIds, _ = self._to_int_array(videoIds)
+        startpoints, _ = self._to_int_array(startpoints)
+        endpoints, _ = self._to_int_array(endpoints)
+        margins = np.broadcast_to(np.asarray(margins, dtype=np.int64), videoIds.shape)
+
+        column = 'startframe' if unit == 'frames' else 'start'
+        start = np.maximum(self._search_batch(videoIds, startpoints - margins, column, side='right') - 1, 0)   # the smallest shot ID that intersect the segment
+        stop = self._search_batch(videoIds, endpoints + margins, column, side='left')     # the first shot ID that does not intersect the segment
+        return start, stop
+
+    def get_shot_times_from_videos_and_frames(self, videoIds, frames):
+        """
+        vectorized version of get_shot_time_from_video_and_frame
+        videoIds, frames: array-likes with the same length
+        returns a float64 array of times in milliseconds, INVALID where the frame is not a valid number
+        """
+
+        videoIds, _ = self._to_int_array(videoIds)
+        frames, invalid = self._to_int_array(frames)
+        if invalid.any():
+            logging.warning('Found {} invalid frame numbers in logs. Setting to {}'.format(invalid.sum(), self.INVALID))
+
+        fps = self.fps_values[self._get_video_indexes(videoIds, self.fps_video_ids)]
+        times = frames * 1000 / fps
+        times[invalid] = self.INVALID
+        return times
+
+    def get_shot_times_from_videos_and_segments(self, videoIds, segments, method="middle_frame"):
+        """
+        vectorized version of get_shot_time_from_video_and_segment
+        videoIds, segments: array-likes with the same length
+        returns a float64 array of times in milliseconds, nan where the segment does not exist
+        """
+
+        if method != 'middle_frame':
+            raise ValueError('Method {} not recognized!'.format(method))
+
+        videoIds, _ = self._to_int_array(videoIds)
+        segments, invalid = self._to_int_array(segments)
+        self._get_video_indexes(videoIds, self.fps_video_ids)    # raises KeyError for videos without FPS information
+
+        times = np.full(len(videoIds), np.nan)
+        if self.lazy:
+            for videoId, positions in self._group_by_video(videoIds):
+                segment_times = self._get_video_segment_times(videoId)
+                valid = positions[~invalid[positions] & (segments[positions] >= 0) & (segments[positions] < len(segment_times))]
+                times[valid] = segment_times[segments[valid]]
+        else:
+            segment_times, segment_offsets = self._get_segment_times()
+            video_idxs = self._get_video_indexes(videoIds, self.video_ids)
+            widths = segment_offsets[video_idxs + 1] - segment_offsets[video_idxs]
+            valid = ~invalid & (segments >= 0) & (segments < widths)
+            times[valid] = segment_times[segment_offsets[video_idxs[valid]] + segments[valid]]
+        missing = np.isnan(times)
+        if missing.any():
+            logging.warning('{} segments (out of {}) not found in {} videos. Setting to nan'.format(
+                missing.sum(), len(missing), len(np.unique(videoIds[missing]))))
+        return times
@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import seaborn as sns
 from generate.result import Result
-from generate.utils import compute_user_penalty, get_team_values_df
+from generate.utils import TEAM_VALUES_COLUMNS, compute_user_penalty, get_team_values_df
 
 import matplotlib.pyplot as plt
 import logging
@@ -11,6 +11,8 @@ logging.basicConfig(level=logging.INFO)
 np.random.seed(45)
 
 class BestShotRankBoxplot(Result):
+    events_columns = TEAM_VALUES_COLUMNS
+
     def __init__(self, data, teams, logs, **kwargs):
         super().__init__(**kwargs, cache_filename='TimeRecallTable.pkl')
         self.data = data
@@ -32,7 +34,7 @@ class BestShotRankBoxplot(Result):
 
         dfs = []
         for team in self.teams:
-            team_df = self.logs[team].get_events_dataframe().reset_index()
+            team_df = self.logs[team].get_events_dataframe(self.events_columns + self.logs[team].get_rank_columns()).reset_index()
             if team in aggregate_users_for:
             # these teams have undistinguishable physical users, given that their logs are taken from DRES
                 team_df['user'] = 0
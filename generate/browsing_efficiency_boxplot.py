@@ -1,13 +1,15 @@
 import pandas as pd
 import seaborn as sns
 from generate.result import Result
-from generate.utils import compute_user_penalty, get_team_values_df
+from generate.utils import TEAM_VALUES_COLUMNS, compute_user_penalty, get_team_values_df
 
 import matplotlib.pyplot as plt
 import logging
 logging.basicConfig(level=logging.INFO)
 
 class BrowsingEfficiencyBoxplot(Result):
+    events_columns = TEAM_VALUES_COLUMNS
+
     def __init__(self, data, teams, logs, **kwargs):
         super().__init__(**kwargs, cache_filename='TimeRecallTable.pkl')
         self.data = data
@@ -25,7 +27,7 @@ class BrowsingEfficiencyBoxplot(Result):
         self.split_user = split_user
         dfs = []
         for team in self.teams:
-            team_df = self.logs[team].get_events_dataframe().reset_index()
+            team_df = self.logs[team].get_events_dataframe(self.events_columns + self.logs[team].get_rank_columns()).reset_index()
             team_df = get_team_values_df(self.data, team_df, split_user, max_records)
             dfs.append(team_df)
 
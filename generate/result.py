@@ -3,6 +3,9 @@ import pandas as pd
 
 
 class Result:
+    # columns of the team events read by _generate (None to read all of them)
+    events_columns = None
+
     def __init__(self, use_cache=True, cache_path='cache/results', cache_filename=None) -> None:
         self.use_cache = use_cache
         self.cache_path = cache_path
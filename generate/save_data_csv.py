@@ -1,5 +1,6 @@
 import pandas as pd
 from generate.result import Result
+from common.logs import to_plain_dtypes
 import re
 
 class saveDATAasCSV(Result):
@@ -8,32 +9,29 @@ class saveDATAasCSV(Result):
         #self.data =data
         self.logs=logs
         self.tasks=df_tasks=data['runreader'].tasks.tasks_df
+        self.submissions=data['runreader'].tasks.submissions_df
 
 
     def _generate(self, **kwargs):
         """
         Returns Pandas dataframe with all the submissions
         """
-        r = re.compile("([a-zA-Z]+)([0-9]+)")
-        df=[]
-        for index, row in self.tasks.iterrows():
-            submissions=row['submissions']
-            for s in submissions:
-                teamFamily, user=r.match(s['teamName']).groups()
-                d={
-                    'taskName':row['name'],
-                    'team':s['teamName'],
-                    'teamFamily': teamFamily,
-                    'user':user,
-                    'task_start': row['started'] ,
-                    'task_end': row['ended'],
-                    'timestamp':s['timestamp'],
-                    'sessionID': s['teamId']['string'],
-                    'status':s['status']
-                }
-                df.append(d)
+        submissions = self.submissions[['task', 'team', 'timestamp', 'team_id', 'status']]
+        tasks = self.tasks[['name', 'started', 'ended']].rename(columns={'name': 'task', 'started': 'task_start', 'ended': 'task_end'})
+        df = submissions.merge(tasks.drop_duplicates('task'), on='task', how='inner')
 
-        df = pd.DataFrame(df)
+        names = df['team'].str.extract("^([a-zA-Z]+)([0-9]+)")
+        df = pd.DataFrame({
+            'taskName': df['task'],
+            'team': df['team'],
+            'teamFamily': names[0],
+            'user': names[1],
+            'task_start': df['task_start'],
+            'task_end': df['task_end'],
+            'timestamp': df['timestamp'],
+            'sessionID': df['team_id'],
+            'status': df['status']
+        })
 
         return df
 
@@ -53,12 +51,15 @@ class saveDATAasCSV(Result):
         r = re.compile("([a-zA-Z]+)([0-9]+)")
         for team, log in  self.logs.items():
             teamFamily, user = r.match(team).groups()
-            log.df_results['user']=user
-            log.df_results['teamFamily'] = teamFamily
-            log.df_events['user']=user
-            log.df_events['teamFamily'] = teamFamily
-            log.df_events.to_csv(f"output/vbse2022/team_logs_csv/{team}_events.csv", index=False)
-            log.df_results.to_csv(f"output/vbse2022/team_logs_csv/{team}_results.csv", index=False)
+            # the logs are stored with compact dtypes, the csv files keep the plain ones (e.g., inf for the ranks not found)
+            df_results = to_plain_dtypes(log.df_results)
+            df_events = to_plain_dtypes(log.df_events)
+            df_results['user']=user
+            df_results['teamFamily'] = teamFamily
+            df_events['user']=user
+            df_events['teamFamily'] = teamFamily
+            df_events.to_csv(f"output/vbse2022/team_logs_csv/{team}_events.csv", index=False)
+            df_results.to_csv(f"output/vbse2022/team_logs_csv/{team}_results.csv", index=False)
 
 
 
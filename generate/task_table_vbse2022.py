@@ -16,7 +16,7 @@ class TasksTableVbse2022(Result):
         vbsRunID = run['id']['string']  # RunId of the official vbse
         tasks = runreader.tasks.tasks_df  # it is used to check if a timestamp is inside a KIS task
 
-        tasks = tasks.drop(['duration', 'position', 'task_type', 'uid', 'submissions'], axis=1)
+        tasks = tasks.drop(['duration', 'position', 'task_type', 'uid'], axis=1)
         tasks['started'] = tasks.started.astype('int64')
         tasks['ended'] = tasks.ended.astype('int64')
         tasks['correct_shot'] = tasks.correct_shot.astype('int64')
@@ -1,9 +1,11 @@
 import pandas as pd
 import numpy as np
 from generate.result import Result
-from generate.utils import compute_user_penalty, get_team_values_df
+from generate.utils import TEAM_VALUES_COLUMNS, compute_user_penalty, get_team_values_df
 
 class TimeRecallTable(Result):
+    events_columns = TEAM_VALUES_COLUMNS
+
     def __init__(self, data, teams, logs, **kwargs):
         super().__init__(**kwargs)
         self.data = data
@@ -19,7 +21,7 @@ class TimeRecallTable(Result):
         max_records=kwargs.get('max_records', 10000)
         dfs = []
         for team in self.teams:
-            team_df = self.logs[team].get_events_dataframe().reset_index()
+            team_df = self.logs[team].get_events_dataframe(self.events_columns + self.logs[team].get_rank_columns()).reset_index()
             team_df = get_team_values_df(self.data, team_df, split_user if not only_best_user else True, max_records)
             dfs.append(team_df)
 
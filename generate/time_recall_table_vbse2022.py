@@ -1,8 +1,10 @@
 import pandas as pd
 from generate.result import Result
-from generate.utils import get_team_values_vbse2022_df
+from generate.utils import TEAM_VALUES_COLUMNS, get_team_values_vbse2022_df
 
 class TimeRecallTableVbse2022(Result):
+    events_columns = TEAM_VALUES_COLUMNS
+
     def __init__(self, data, teams, logs, **kwargs):
         super().__init__(**kwargs)
         self.data = data
@@ -16,7 +18,7 @@ class TimeRecallTableVbse2022(Result):
         max_records = kwargs.get('max_records', 10000)
         dfs = []
         for team in self.teams:
-            team_df = self.logs[team].get_events_dataframe().reset_index()
+            team_df = self.logs[team].get_events_dataframe(self.events_columns + self.logs[team].get_rank_columns()).reset_index()
             team_df = get_team_values_vbse2022_df(self.data, team_df, max_records)
             dfs.append(team_df)
 
@@ -1,14 +1,29 @@
 
 import numpy as np
 
+from common.logs import to_plain_dtypes
+
+# columns of the team events used by get_team_values_df and get_team_values_vbse2022_df, together with the ranks of
+# the correct results (see TeamLogs.get_rank_columns)
+TEAM_VALUES_COLUMNS = ['team', 'user', 'task', 'timestamp', 'correct_submission_time_ms']
+
+def get_plain_team_df(df, max_rank=10000):
+        """
+        convert the compact columns of the team events (see common/logs.py) to the plain dtypes used by the analysis,
+        with inf also for the ranks bigger than max_rank
+        """
+        df = to_plain_dtypes(df)
+        for c in df.columns:
+                if c.startswith('rank_'):
+                        df[c] = df[c].mask(df[c] > max_rank, np.inf)
+        return df
+
+
 def get_team_values_vbse2022_df(data, df, max_rank=10000):
         runreader = data['runreader']
-        df['user'] = 0
         #remove ranks bigger than max_rank
-        replace_large_ranks = lambda x: np.inf if x > max_rank  else x
-        df['rank_video'] = df['rank_video'].apply(replace_large_ranks)
-        df['rank_shot_margin_0'] = df['rank_shot_margin_0'].apply(replace_large_ranks)
-        df['rank_shot_margin_5'] = df['rank_shot_margin_5'].apply(replace_large_ranks)
+        df = get_plain_team_df(df, max_rank)
+        df['user'] = 0
 
         # for each (team, user, task), find the minimum ranks and the timestamps
         df=df.sort_values('timestamp')
@@ -82,13 +97,10 @@ def get_team_values_vbse2022_df(data, df, max_rank=10000):
 def get_team_values_df(data, df, split_users=False, max_rank=10000):
         runreader = data['runreader']
 
+        #remove ranks bigger than max_rank
+        df = get_plain_team_df(df, max_rank)
         if(not split_users):
                 df['user'] = 0
-        #remove ranks bigger than max_rank
-        replace_large_ranks = lambda x: np.inf if x > max_rank  else x
-        df['rank_video'] = df['rank_video'].apply(replace_large_ranks)
-        df['rank_shot_margin_0'] = df['rank_shot_margin_0'].apply(replace_large_ranks)
-        df['rank_shot_margin_5'] = df['rank_shot_margin_5'].apply(replace_large_ranks)
 
         # for each (team, user, task), find the minimum ranks and the timestamps
         df=df.sort_values('timestamp')
@@ -1,3 +1,5 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
 import tqdm
 from common.load import load_data
 import generate
@@ -9,34 +11,104 @@ from common.logs import TeamLogs
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
-def main(args):
-    # load config file for this plot
-    with open(args.config, 'r') as f:
-        cfg = yaml.load(f, Loader=yaml.FullLoader)
-
-    # load competition data
-    teams = cfg["teams"]
+def load_competition_data(cfg, args):
     competition_data = load_data(
-        teams,
+        cfg["teams"],
         cfg['audits_file'],
         cfg['run_file'],
         args.v3c_fps_file,
-        args.v3c_segments_files)
+        args.v3c_segments_files,
+        args.v3c_segments_cache,
+        args.lazy_videos,
+        snapshot_cache='cache/competition_data' if args.data_cache else None,
+        audit_time_window=cfg.get('audit_time_window'),
+        audit_types=cfg.get('audit_types'))
     competition_data['config'] = cfg
     competition_data['args'] = args
-    
-    plot_cfgs = [c for c in cfg["generate"] if c["name"] in args.graphs]
+    return competition_data
+
+
+def get_log_size(log_folder):
+    """
+    total size (in bytes) of the log files of a team, 0 if the team has no logs
+    """
+    if log_folder is None:
+        return 0
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(log_folder) for f in files)
+
+
+# competition data of a worker process, received once by init_worker
+_worker_data = None
+
+def init_worker(competition_data):
+    # the data loaded by the main process is passed to the workers, instead of being loaded again by every worker
+    # (the V3C segments are opened again from their compiled store, see Videos.__reduce__)
+    global _worker_data
+    _worker_data = competition_data
+
+
+def ingest_team_logs(team, max_records, cache_path, target_shot_margins=[0, 5], ranks_only=False):
+    """
+    create (or update) the logs of a team in a worker process, and return the files where they are cached
+    """
+    team_log = TeamLogs(_worker_data, team, max_records=max_records, use_cache=_worker_data['args'].log_cache, cache_path=cache_path,
+                        target_shot_margins=target_shot_margins, ranks_only=ranks_only)
+    return TeamLogs.get_cache_files(cache_path, _worker_data['version'], team, team_log.cache_key)
+
+
+def load_team_logs(competition_data, teams, max_records=10000, cache_path='cache/team_logs', workers=1, log_workers=1, target_shot_margins=[0, 5], ranks_only=False):
+    """
+    create or load the logs of each team. With more than one worker, the teams are processed in parallel processes
+    (largest logs first), which write the logs in the cache; the logs are then read back from the cache.
+    Otherwise, the log files of each team are parsed by log_workers processes
+    target_shot_margins, ranks_only: see TeamLogs
+    """
+    args = competition_data['args']
+    if workers > 1:
+        log_folders = competition_data['config']['logs']
+        cache_key = TeamLogs.get_cache_key(max_records, target_shot_margins, ranks_only, competition_data.get('inputs_key'))
+        # teams without logs are always read from the cache, the cached teams are generated again only without log cache
+        # or if their log files changed (in this case, only the changed files are parsed again)
+        scheduled_teams = [t for t in teams if log_folders[t] is not None and not (args.log_cache and all(
+            f.exists() for f in TeamLogs.get_cache_files(cache_path, competition_data['version'], t, cache_key))
+            and not TeamLogs.logs_changed(competition_data, t, cache_key, cache_path))]
+        scheduled_teams = sorted(scheduled_teams, key=lambda t: get_log_size(log_folders[t]), reverse=True)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(competition_data,)) as executor:
+            futures = {executor.submit(ingest_team_logs, team, max_records, cache_path, target_shot_margins, ranks_only): team for team in scheduled_teams}
+            for future in tqdm.tqdm(as_completed(futures), total=len(futures), desc='Generating intermediate DataFrames ({} workers)'.format(workers)):
+                logging.debug('Logs of {} cached in {}'.format(futures[future], future.result()))
 
-    # create or load logs, for each team
     logs = {}
     for team in tqdm.tqdm(teams, desc='Loading (or generating) intermediate DataFrames'):
+        # the logs generated by the workers are read from the cache even without log cache: their manifest describes
+        # the log files they were generated from (see TeamLogs.get_data), so they are not generated again
         team_log = TeamLogs(
             competition_data, 
             team,
-            max_records=10000, 
-            use_cache=args.log_cache, 
-            cache_path='cache/team_logs')
+            max_records=max_records, 
+            use_cache=args.log_cache or workers > 1, 
+            cache_path=cache_path,
+            workers=log_workers,
+            target_shot_margins=target_shot_margins,
+            ranks_only=ranks_only)
         logs[team] = team_log
+    return logs
+
+
+def main(args):
+    # load config file for this plot
+    with open(args.config, 'r') as f:
+        cfg = yaml.load(f, Loader=yaml.FullLoader)
+
+    # load competition data
+    teams = cfg["teams"]
+    competition_data = load_competition_data(cfg, args)
+    
+    plot_cfgs = [c for c in cfg["generate"] if c["name"] in args.graphs]
+
+    # create or load logs, for each team
+    logs = load_team_logs(competition_data, teams, max_records=10000, cache_path='cache/team_logs', workers=args.workers, log_workers=args.log_workers, ranks_only=args.ranks_only)
+    logging.info('V3C videos usage: {}'.format(competition_data['v3c_videos'].get_stats()))
 
     # generate results
     for plot_cfg in tqdm.tqdm(plot_cfgs, desc='Generating plots'):
@@ -50,10 +122,17 @@ if __name__ == '__main__':
     parser.add_argument('--config', default='config2022.yaml', help='config file to generate the graph')
     parser.add_argument('--v3c_segments_files', nargs='+', default=['data/v3c1_frame_segments.csv', 'data/v3c2_frame_segments.csv'])
     parser.add_argument('--v3c_fps_file', default='data/v3c1_2_fps.csv')
+    parser.add_argument('--v3c_segments_cache', default='cache/v3c_segments', help='Where to store the compiled V3C segments (see scripts/compile_v3c_segments.py)')
+    parser.add_argument('--lazy_videos', action='store_true', help='Load the shots of a video only when the video is used')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes used to generate the intermediate DataFrames of the teams')
+    parser.add_argument('--log_workers', type=int, default=1, help='Number of processes used to parse the log files of a single team (when --workers is 1)')
+    parser.add_argument('--ranks_only', action='store_true', help='Keep only the ranks of the correct results of every logged ranked list, not its results (the raw results are not available to the graphs)')
+    parser.add_argument('--no_data_cache', action='store_true', help='Whether to use the snapshot of the parsed run, audits and tasks')
     parser.add_argument('--no_log_cache', action='store_true', help='Whether to use the log cache from each team')
     parser.add_argument('--no_result_cache', action='store_true', help='Whether to use the result cache for rendering results')
 
     args = parser.parse_args()
     args.result_cache = not args.no_result_cache
     args.log_cache = not args.no_log_cache
+    args.data_cache = not args.no_data_cache
     main(args)
@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+import time
+import yaml
+sys.path.append(".")
+
+from common import fastjson
+
+
+def main(args):
+    with open(args.config, 'r') as f:
+        cfg = yaml.load(f, Loader=yaml.FullLoader)
+
+    # read the log files in memory, so that only the decoding is measured
+    documents = []
+    for team in cfg['teams']:
+        team_log = cfg['logs'][team]
+        if team_log is None:
+            continue
+        for root, _, files in os.walk(team_log):
+            for file in files:
+                if file.endswith('.json') and len(documents) < args.max_files:
+                    with open(os.path.join(root, file), 'rb') as f:
+                        documents.append(f.read())
+    size = sum(len(d) for d in documents)
+    print('{} log files, {:.1f} MB'.format(len(documents), size / (1024 * 1024)))
+
+    timings = {}
+    for decoder in fastjson.get_decoders():
+        fastjson.set_decoder(decoder)
+        start = time.time()
+        for _ in range(args.repeat):
+            for d in documents:
+                fastjson.loads(d)
+        timings[decoder] = (time.time() - start) / args.repeat
+        print('{}: {:.3f}s ({:.1f} MB/s), speedup over stdlib: {:.2f}x'.format(
+            decoder, timings[decoder], size / (1024 * 1024) / timings[decoder], timings['stdlib'] / timings[decoder]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the decoding speed of the available JSON decoders on the team log files')
+    parser.add_argument('--config', default='config2022.yaml', help='config file listing the log folders of the teams')
+    parser.add_argument('--max_files', type=int, default=5000, help='maximum number of log files to decode')
+    parser.add_argument('--repeat', type=int, default=3, help='number of times every file is decoded')
+
+    args = parser.parse_args()
+    main(args)
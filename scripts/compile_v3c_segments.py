@@ -0,0 +1,26 @@
+import argparse
+import sys
+import time
+sys.path.append(".")
+
+from common.videos import Videos
+
+
+def main(args):
+    # building the Videos compiles the csv files into the binary store (or reuses it, if it is up to date)
+    for segments_files in [args.v3c_segments_files, args.cineast_segments_files]:
+        start = time.time()
+        videos = Videos(segments_files, args.v3c_fps_file, cache_path=args.cache_path)
+        print('{}: {} videos, {} shots ({:.2f}s)'.format(
+            ', '.join(segments_files), len(videos.video_ids), videos.offsets[-1], time.time() - start))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile the V3C segments csv files into a binary, memory-mapped store')
+    parser.add_argument('--v3c_segments_files', nargs='+', default=['data/v3c1_frame_segments.csv', 'data/v3c2_frame_segments.csv'])
+    parser.add_argument('--cineast_segments_files', nargs='+', default=['data/v3c1_2_cineast_segments.csv'])
+    parser.add_argument('--v3c_fps_file', default='data/v3c1_2_fps.csv')
+    parser.add_argument('--cache_path', default='cache/v3c_segments', help='where to store the compiled segments')
+
+    args = parser.parse_args()
+    main(args)
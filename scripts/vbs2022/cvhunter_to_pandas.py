@@ -17,7 +17,8 @@ def main(args):
         args.audits_file, 
         args.run_file, 
         args.v3c_fps_file,
-        args.v3c_segments_files)
+        args.v3c_segments_files,
+        lazy_videos=True)  # only the task targets are needed
     runreader = competition_data['runreader']
 
     def get_task_start(taskname):
@@ -26,12 +27,6 @@ def main(args):
             return np.nan
         else:
             return x['started']
-    def get_task_name(timestamp):
-        x = runreader.tasks.get_task_from_timestamp(timestamp)
-        if x is None:
-            return np.nan
-        else:
-            return x['name']
 
     events_df = pd.read_csv(args.input_file)
 
@@ -49,7 +44,9 @@ def main(args):
     events_df.loc[events_df['user'] == 'LP','user'] = 0
     events_df.loc[events_df['user'] == 'JL','user'] = 1
     events_df['timestamp']=events_df['timestamp']*1000
-    events_df['task'] = events_df['timestamp'].apply(get_task_name)
+    task_ids = runreader.tasks.get_task_ids_from_timestamps(events_df['timestamp'].to_numpy())
+    task_names = runreader.tasks.tasks_df['name'].to_numpy()
+    events_df['task'] = np.where(task_ids >= 0, task_names[task_ids], np.nan)
     events_df = events_df[events_df['task'].notna()]
     task_start=events_df['task'].apply(get_task_start)
 
@@ -8,6 +8,8 @@ import pickle
 import time
 import numpy as np
 
+from common.audits import get_logins, get_sessions
+from common import fastjson
 from common.load import load_data
 
 
@@ -133,43 +135,16 @@ def get_data_from_raw_files(args):
             args.audits_file,
             args.run_file,
             args.v3c_fps_file,
-            args.v3c_segments_files)
+            args.v3c_segments_files,
+            lazy_videos=True,  # only the task targets are needed
+            audit_types=['LOGIN'])
 
         ## getting LOGIN info from the audit file
         audit = competition_data['audit']
-        session_team_list = []
-        for audit_event in audit:
-            if audit_event['type'] == "LOGIN":
-                session = audit_event['session']
-                team = audit_event['user']
-                login_time = audit_event['timestamp']
-                session_team_list.append({'session': session, 'team': team, 'login_timestamp': login_time})
-
-        all_sessions_df = pd.DataFrame(session_team_list)
+        all_sessions_df = get_logins(audit)
         all_sessions_df.to_csv(f"{args.output_folder}/sessionIdLogin.csv")  # saving session IDlogin
-        sessions = all_sessions_df['session'].unique()
-
-        session_df = pd.DataFrame(columns=['session', 'team', 'login', 'logout'])
-        for s in sessions:
-            selected = all_sessions_df.loc[all_sessions_df['session'] == s]
-            # if len(selected.index)>1:
-            #     #finding consecutive rows with the same session and same team to merge the login
-            #     # selected['pattern']=(selected.groupby(['session', selected['team'].ne(selected['team'].shift()).cumsum()])['session'].transform('size').ge(2).astype(int))
-            #     g = (selected['team'] != selected.shift().fillna(method='bfill')['team']).cumsum().rename('group')
-            #     selected=selected.groupby(['session', 'team', g])['login_timestamp'].agg(['min']).reset_index().rename(
-            #         columns={'min': 'login'}).drop(['group'], axis=1)
-            # else:
-            #
-            selected = selected.rename(columns={'login_timestamp': 'login'})
-            selected.sort_values(by='login', inplace=True, ascending=True)
-            logins = selected['login'].values
-            logout = [logins[l + 1] for l in range(len(logins) - 1)]
-            logout.append(
-                1654732799000)  # no info on the logout, setting 8 June 2022, 11PM #(datetime.timestamp(datetime.now()) * 1000)
-            selected['logout'] = logout
-            # selected['login_time'] = selected['login'].apply(lambda x: datetime.fromtimestamp(x/1000))
-            # selected['logout_time'] = selected['logout'].apply(lambda x: datetime.fromtimestamp(x/1000))
-            session_df = pd.concat([session_df, selected])
+        # a session is used by a team from its login to the next login of the same session
+        session_df = get_sessions(all_sessions_df, 1654732799000)  # no info on the logout, setting 8 June 2022, 11PM
 
         ## getting info from the run file
         runreader = competition_data['runreader']  # RunReader2022
@@ -180,18 +155,16 @@ def get_data_from_raw_files(args):
         ## reading the raw files
         for filename in os.listdir(raw_event_log_folder):
             f = os.path.join(raw_event_log_folder, filename)
-            with open(f, 'r') as ff:
+            with open(f, 'rb') as ff:
                 print(f"Reading file {f}, about {round(os.stat(f).st_size / (1024 * 1024))} MB ...", end='   ')
                 for line in ff:
-                    raw_event = json.loads(line)  #
+                    raw_event = fastjson.loads(line)  #
                     dres_timestamp = raw_event['timeStamp']
 
                     isNotVBS = raw_event['runId']['string'] != vbsRunID
-                    # excluding events not related to Official KIS VBS run # using 5 seconds of tollerance before the start and end of a task
-                    isNotKIStask = (tasks.get_task_from_timestamp(dres_timestamp) is None) and (
-                                tasks.get_task_from_timestamp(dres_timestamp + 5000) is None) and (
-                                           tasks.get_task_from_timestamp(
-                                               dres_timestamp - 5000) is None)
+                    # excluding events not related to Official KIS VBS run # using some tollerance (5 seconds by default) before the start and after the end of a task
+                    task, _ = tasks.get_task_from_timestamp_with_tolerance(dres_timestamp, args.task_tolerance_ms, args.task_tolerance_ms)
+                    isNotKIStask = task is None
 
                     isResultLogEvent = raw_event['class'] == 'dev.dres.run.eventstream.QueryResultLogEvent'
                     isEventLogEvent = raw_event['class'] == 'dev.dres.run.eventstream.QueryEventLogEvent'
@@ -319,6 +292,7 @@ if __name__ == '__main__':
     parser.add_argument('--audits_file', default='../../data/2022/audits.json')
     parser.add_argument('--run_file', default='../../data/2022/run.json')
     parser.add_argument('--v3c_fps_file', default='../../data/v3c1_2_fps.csv')
+    parser.add_argument('--task_tolerance_ms', type=int, default=5000, help='events logged up to this time before the start or after the end of a KIS task are kept')
     parser.add_argument('--v3c_segments_files', nargs='+',
                         default=['../../data/v3c1_frame_segments.csv', '../../data/v3c2_frame_segments.csv'])
 
@@ -16,7 +16,8 @@ def main(args):
         args.audits_file,
         args.run_file,
         args.v3c_fps_file,
-        args.v3c_segments_files)
+        args.v3c_segments_files,
+        lazy_videos=True)  # only the task targets are needed
 
     ## getting info from the run file
     runreader = competition_data['runreader']  # RunReader2022
@@ -0,0 +1,84 @@
+import sys
+import argparse
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.runreaders import RunReader2022
+from common.videos import Videos
+
+TEAM = 'VISIONE'
+T0 = 1654500000000
+VIDEOS = {1: 25.0, 2: 30.0}   # FPS of the videos, each one with 10 shots of 100 frames
+
+
+@pytest.fixture
+def v3c_videos(tmp_path):
+    segments = []
+    for video, fps in VIDEOS.items():
+        for s in range(10):
+            segments.append({'video': video, 'segment': s, 'startframe': 100 * s, 'endframe': 100 * s + 99,
+                             'start': int(100 * s * 1000 / fps), 'end': int((100 * s + 99) * 1000 / fps)})
+    pd.DataFrame(segments).to_csv(tmp_path / 'segments.csv', index=False)
+    (tmp_path / 'fps.csv').write_text(''.join('{:05d},{}\n'.format(video, fps) for video, fps in VIDEOS.items()))
+    return Videos([tmp_path / 'segments.csv'], tmp_path / 'fps.csv', cache_path=None)
+
+
+def get_run(num_tasks):
+    """
+    a run with num_tasks KIS tasks of 5 minutes. The team submits the correct result of the even tasks after 2 minutes
+    """
+    tasks = []
+    for i in range(num_tasks):
+        started = T0 + i * 600000
+        video = 1 + i % 2
+        tasks.append({'started': started, 'ended': started + 305000, 'duration': 300, 'position': i, 'uid': {'string': 'task{}'.format(i)},
+                      'description': {'name': 'kis-{:02d}'.format(i), 'taskType': {'name': 'Visual KIS'},
+                                      'target': {'item': {'name': '{:05d}'.format(video)},
+                                                 'temporalRange': {'start': {'millisecond': 12000}, 'end': {'millisecond': 15000}}}},
+                      'submissions': [{'teamId': {'string': 'uid-team'}, 'status': 'CORRECT' if i % 2 == 0 else 'WRONG',
+                                       'timestamp': started + 125000, 'item': {'name': '{:05d}'.format(video)}}]})
+    return {'description': {'teams': [{'name': TEAM, 'uid': {'string': 'uid-team'}}]}, 'tasks': tasks}
+
+
+def write_log_files(log_folder, run, seed=0, num_logs=6):
+    """
+    write num_logs log files for every task and for each of the two users of the team (in the folders user0 and user1),
+    plus a log outside of the tasks. Some ranked lists are zero-based, some contain the target
+    """
+    rng = np.random.default_rng(seed)
+    for user in range(2):
+        user_folder = Path(log_folder) / 'user{}'.format(user)
+        user_folder.mkdir(parents=True, exist_ok=True)
+        for task in run['tasks']:
+            for _ in range(num_logs):
+                timestamp = task['started'] + 5000 + int(rng.integers(0, 300000))
+                num_results = int(rng.integers(1, 50))
+                first_rank = int(rng.integers(0, 2))
+                results = [{'item': '{:05d}'.format(int(rng.integers(1, 3))), 'frame': int(rng.integers(0, 1000)), 'rank': first_rank + r}
+                           for r in range(num_results)]
+                events = [{'timestamp': timestamp, 'category': 'TEXT', 'type': str(rng.choice(['jointEmbedding', 'OCR'])), 'value': 'a dog'}]
+                with open(user_folder / '{}.json'.format(timestamp), 'w') as f:
+                    json.dump({'timestamp': timestamp, 'results': results, 'events': events}, f)
+        with open(user_folder / '{}.json'.format(T0 - 1000), 'w') as f:
+            json.dump({'timestamp': T0 - 1000, 'results': [], 'events': []}, f)
+
+
+@pytest.fixture
+def competition_data(tmp_path, v3c_videos):
+    """
+    the data of a run with the log files of a team, as returned by common.load.load_data (with the config)
+    """
+    run = get_run(4)
+    log_folder = tmp_path / 'logs' / TEAM
+    write_log_files(log_folder, run)
+    return {
+        'version': '2022',
+        'config': {'logs': {TEAM: str(log_folder)}},
+        'args': argparse.Namespace(v3c_fps_file=str(tmp_path / 'fps.csv')),
+        'v3c_videos': v3c_videos,
+        'runreader': RunReader2022(run, v3c_videos, [TEAM])
+    }
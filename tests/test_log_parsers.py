@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.logs import TeamLogParser, TeamLogFileReader, get_columns
+
+
+def get_results_divexplore_baseline(v3c_videos, result):
+    # the parser of a single log file, before the results of many files were parsed at once
+    result = result.rename(columns={'item': 'videoId'})
+    result['videoId'] = result['videoId'].apply(lambda x: x.replace('v_', ''))
+    if 'frame' not in result.columns:
+        result['shotTimeMs'] = np.nan
+    else:
+        result['shotTimeMs'] = result.apply(lambda x: v3c_videos.get_shot_time_from_video_and_frame(x['videoId'], x['frame']), axis=1)
+    result['videoId'] = result['videoId'].astype(int)
+    return result.filter(['shotTimeMs', 'shotId', 'videoId', 'rank'])
+
+
+def test_divexplore_results_without_frame(v3c_videos):
+    files = [
+        [{'item': 'v_00001', 'frame': 250, 'rank': 1}, {'item': 'v_00002', 'frame': 10, 'rank': 2}],
+        # some results without "frame" information
+        [{'item': 'v_00002', 'frame': 120, 'rank': 0}, {'item': 'v_00001', 'rank': 1}, {'item': 'v_00001', 'frame': None, 'rank': 2}],
+        # no "frame" information at all
+        [{'item': 'v_00001', 'rank': 1}, {'item': 'v_00002', 'rank': 2}],
+    ]
+    log_parser = TeamLogParser({'version': '2022'}, 'diveXplore', v3c_videos)
+    log_file_reader = TeamLogFileReader('diveXplore', None, None, log_parser, max_records=10000)
+    logs = [{'task': 'task', 'results': get_columns(records)} for records in files]
+    log_file_reader.parse_results(logs)
+
+    for log, records in zip(logs, files):
+        expected = get_results_divexplore_baseline(v3c_videos, pd.DataFrame(records))
+        np.testing.assert_array_equal(log['results']['shotTimeMs'], expected['shotTimeMs'])
+        np.testing.assert_array_equal(log['results']['videoId'], expected['videoId'])
+        np.testing.assert_array_equal(log['results']['rank'], expected['rank'] + (expected['rank'].min() == 0))
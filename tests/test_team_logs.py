@@ -0,0 +1,120 @@
+import sys
+import copy
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.logs import TeamLogs, to_compact_dtypes, to_plain_dtypes
+from common.runreaders import RunReader2022
+
+TEAM = 'CVHunter'
+TEAM_WITH_LOGS = 'VISIONE'   # team of the competition_data fixture (see conftest.py)
+VERSION = '2022'
+
+
+def write_external_logs(cache_path, num_logs):
+    """
+    write the results and the events of a team without logs, as done by scripts/vbs2022/cvhunter_to_pandas.py
+    """
+    timestamps = 1654500000000 + 1000 * np.arange(num_logs)
+    results = pd.DataFrame({'task': 'vbs22-kis-v01', 'team': TEAM, 'user': 0, 'timestamp': timestamps,
+                            'videoId': 1, 'shotTimeMs': 1000.0, 'rank': 1})
+    events = pd.DataFrame({'task': 'vbs22-kis-v01', 'team': TEAM, 'user': 0, 'timestamp': timestamps,
+                           'elapsed_since_task_start_ms': 1000 * np.arange(num_logs), 'correct_submission_time_ms': np.nan,
+                           'rank_video': 1.0, 'rank_shot_margin_0': np.inf, 'rank_shot_margin_5': np.inf,
+                           'category': 'TEXT', 'type': 'jointEmbedding', 'value': 'a dog', 'additionals': '{}'})
+    results_file, events_file = TeamLogs.get_cache_files(cache_path, VERSION, TEAM)
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    results.to_pickle(results_file)
+    events.to_pickle(events_file)
+
+
+@pytest.mark.parametrize('use_cache', [True, False])
+def test_external_logs_are_read_again_when_regenerated(tmp_path, use_cache):
+    data = {'version': VERSION, 'config': {'logs': {TEAM: None}}, 'v3c_videos': None, 'runreader': None}
+
+    write_external_logs(tmp_path, 180)
+    team_logs = TeamLogs(data, TEAM, use_cache=use_cache, cache_path=tmp_path)
+    assert len(team_logs.df_results) == 180
+    assert len(team_logs.df_events) == 180
+
+    write_external_logs(tmp_path, 10)
+    team_logs = TeamLogs(data, TEAM, use_cache=use_cache, cache_path=tmp_path)
+    assert len(team_logs.df_results) == 10
+    assert len(team_logs.get_events_dataframe(['task', 'user', 'timestamp', 'rank_video'])) == 10
+    # no copy of the external files is kept in the cache
+    assert sorted(f.name for f in (tmp_path / VERSION).iterdir()) == ['{}_events.pkl'.format(TEAM), '{}_results.pkl'.format(TEAM)]
+
+
+def test_parallel_ingestion_is_the_same_as_sequential(tmp_path, competition_data):
+    sequential = TeamLogs(competition_data, TEAM_WITH_LOGS, cache_path=tmp_path / 'sequential', workers=1, chunk_size=5)
+    parallel = TeamLogs(competition_data, TEAM_WITH_LOGS, cache_path=tmp_path / 'parallel', workers=3, chunk_size=5)
+    assert len(sequential.df_results) > 0
+    pd.testing.assert_frame_equal(parallel.df_results, sequential.df_results)
+    pd.testing.assert_frame_equal(parallel.df_events, sequential.df_events)
+
+
+def test_incremental_ingestion_is_the_same_as_fresh(tmp_path, competition_data):
+    TeamLogs(competition_data, TEAM_WITH_LOGS, use_cache=True, cache_path=tmp_path / 'cache')
+
+    # a changed, a removed and a new log file
+    log_files = sorted((Path(competition_data['config']['logs'][TEAM_WITH_LOGS]) / 'user0').iterdir())
+    changed, removed = log_files[1], log_files[2]
+    changed.write_text(json.dumps({'results': [{'item': '00001', 'frame': 310, 'rank': 1}], 'events': [{'category': 'TEXT', 'type': 'OCR', 'value': 'a cat'}]}))
+    removed.unlink()
+    timestamp = int(changed.stem) + 1
+    (changed.parent / '{}.json'.format(timestamp)).write_text(json.dumps(
+        {'timestamp': timestamp, 'results': [{'item': '00002', 'frame': 10, 'rank': 1}], 'events': [{'category': 'TEXT', 'type': 'OCR', 'value': 'a car'}]}))
+
+    incremental = TeamLogs(competition_data, TEAM_WITH_LOGS, use_cache=True, cache_path=tmp_path / 'cache')
+    fresh = TeamLogs(competition_data, TEAM_WITH_LOGS, use_cache=False, cache_path=tmp_path / 'fresh')
+    pd.testing.assert_frame_equal(incremental.df_results, fresh.df_results)
+    pd.testing.assert_frame_equal(incremental.df_events, fresh.df_events)
+
+
+def test_logs_of_other_inputs_are_not_read_from_the_cache(tmp_path, competition_data):
+    competition_data['inputs_key'] = 'run'
+    TeamLogs(competition_data, TEAM_WITH_LOGS, use_cache=True, cache_path=tmp_path)
+
+    # a new version of the run, in which the team never submitted a correct result
+    run = copy.deepcopy(competition_data['runreader'].run)
+    for task in run['tasks']:
+        task['submissions'][0]['status'] = 'WRONG'
+    competition_data['runreader'] = RunReader2022(run, competition_data['v3c_videos'], [TEAM_WITH_LOGS])
+    competition_data['inputs_key'] = 'new run'
+    cached = TeamLogs(competition_data, TEAM_WITH_LOGS, use_cache=True, cache_path=tmp_path)
+    fresh = TeamLogs(competition_data, TEAM_WITH_LOGS, use_cache=False, cache_path=tmp_path / 'fresh')
+    assert cached.df_events['correct_submission_time_ms'].isna().all()
+    pd.testing.assert_frame_equal(cached.df_events, fresh.df_events)
+
+
+def test_ranks_only_gives_the_same_ranks(tmp_path, competition_data):
+    full = TeamLogs(competition_data, TEAM_WITH_LOGS, cache_path=tmp_path)
+    ranks_only = TeamLogs(competition_data, TEAM_WITH_LOGS, cache_path=tmp_path, ranks_only=True)
+    pd.testing.assert_frame_equal(ranks_only.df_events, full.df_events)
+
+    # one row per ranked list, with the summary of its results
+    results = full.df_results.groupby('timestamp')
+    summary = ranks_only.df_results.set_index('timestamp').sort_index()
+    assert summary.index.is_unique
+    np.testing.assert_array_equal(summary['num_results'], results.size())
+    np.testing.assert_array_equal(summary['num_videos'], results['videoId'].nunique())
+    ranks = full.df_events.drop_duplicates('timestamp').set_index('timestamp').sort_index()
+    for c in full.get_rank_columns():
+        np.testing.assert_array_equal(summary[c], ranks[c])
+
+
+def test_compact_dtypes_round_trip(tmp_path, competition_data):
+    write_external_logs(tmp_path, 10)
+    results_file, events_file = TeamLogs.get_cache_files(tmp_path, VERSION, TEAM)
+    for plain in [pd.read_pickle(results_file), pd.read_pickle(events_file)]:
+        compact = to_compact_dtypes(plain)
+        assert compact['task'].dtype == 'category' and compact['user'].dtype == np.int8
+        assert all(compact[c].dtype == np.int32 for c in compact.columns if c.startswith('rank'))
+        pd.testing.assert_frame_equal(to_plain_dtypes(compact), plain)
+
+    events = TeamLogs(competition_data, TEAM_WITH_LOGS, cache_path=tmp_path).df_events
+    pd.testing.assert_frame_equal(to_compact_dtypes(to_plain_dtypes(events)), events)